@@ -1,20 +1,40 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, UploadFile, File
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-import crud, schemas, models
-from database import get_db
+from typing import Optional
+from datetime import date
+import io
+import auth, crud, schemas, importers, exporters, fast_json, reference_cache, user_cache
+from database import get_db, get_replica_db, read_session
 
 router = APIRouter()
 
+def _cached_response(request: Request, user_id: int, response_model, load, headers=None):
+    # Per-user read cache: crud bumps the user's version on every write, so hits are never stale
+    def render():
+        data = load()
+        return user_cache.serialize(response_model, data, headers(data) if headers else None)
+    return user_cache.to_response(user_cache.get_or_load(user_id, user_cache.request_key(request), render))
+
 # Authentication endpoints
 @router.post("/login/")
+@auth.public
 def login(user: schemas.UserLogin, db: Session = Depends(get_db)):
     db_user = crud.authenticate_user(db, user.email, user.password)
     if not db_user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    return {"message": "Login successful", "user_id": db_user.id, "email": db_user.email}
+    return {
+        "message": "Login successful",
+        "user_id": db_user.id,
+        "email": db_user.email,
+        "access_token": auth.create_access_token(db_user.id, db_user.email),
+        "token_type": "bearer",
+        "expires_in": auth.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    }
 
 # User endpoints
 @router.post("/users/", response_model=schemas.User)
+@auth.public
 def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
     db_user = crud.get_user_by_email(db, email=user.email)
     if db_user:
@@ -22,16 +42,19 @@ def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
     return crud.create_user(db=db, user=user)
 
 @router.get("/users/", response_model=list[schemas.User])
-def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    users = crud.get_users(db, skip=skip, limit=limit)
+def read_users(skip: int = 0, limit: int = 100, caller: Optional[int] = Depends(auth.caller_id),
+               db: Session = Depends(get_replica_db)):
+    users = crud.get_users(db, skip=skip, limit=limit, user_id=caller)
     return users
 
 @router.get("/users/{user_id}", response_model=schemas.User)
-def read_user(user_id: int, db: Session = Depends(get_db)):
-    db_user = crud.get_user(db, user_id=user_id)
-    if db_user is None:
-        raise HTTPException(status_code=404, detail="User not found")
-    return db_user
+def read_user(request: Request, user_id: int, db: Session = Depends(get_replica_db)):
+    def load():
+        db_user = crud.get_user(db, user_id=user_id)
+        if db_user is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        return db_user
+    return _cached_response(request, user_id, schemas.User, load)
 
 # User profile endpoints
 @router.put("/users/{user_id}", response_model=schemas.User)
@@ -55,27 +78,37 @@ def create_wallet_for_user(user_id: int, wallet: schemas.WalletCreate, db: Sessi
     return crud.create_wallet(db=db, wallet=wallet, user_id=user_id)
 
 @router.get("/users/{user_id}/wallets/", response_model=list[schemas.Wallet])
-def read_wallets(user_id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    wallets = crud.get_wallets(db, user_id=user_id, skip=skip, limit=limit)
-    return wallets
+def read_wallets(request: Request, user_id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_replica_db)):
+    return _cached_response(
+        request, user_id, list[schemas.Wallet], lambda: crud.get_wallets(db, user_id=user_id, skip=skip, limit=limit)
+    )
 
 @router.get("/wallets/{wallet_id}", response_model=schemas.Wallet)
-def read_wallet(wallet_id: int, db: Session = Depends(get_db)):
-    db_wallet = crud.get_wallet(db, wallet_id=wallet_id)
+def read_wallet(wallet_id: int, db: Session = Depends(get_replica_db), owner_id: Optional[int] = Depends(auth.caller_id)):
+    db_wallet = crud.get_wallet(db, wallet_id=wallet_id, owner_id=owner_id)
     if db_wallet is None:
         raise HTTPException(status_code=404, detail="Wallet not found")
     return db_wallet
 
+@router.get("/wallets/{wallet_id}/balance_history", response_model=list[schemas.BalancePoint])
+def read_balance_history(wallet_id: int, start_date: Optional[date] = None, end_date: Optional[date] = None,
+                         interval: str = "day", db: Session = Depends(get_replica_db), owner_id: Optional[int] = Depends(auth.caller_id)):
+    history = crud.get_balance_history(db, wallet_id=wallet_id, start_date=start_date, end_date=end_date, interval=interval,
+                                       owner_id=owner_id)
+    if history is None:
+        raise HTTPException(status_code=404, detail="Wallet not found")
+    return history
+
 @router.put("/wallets/{wallet_id}", response_model=schemas.Wallet)
-def update_wallet(wallet_id: int, wallet: schemas.WalletCreate, db: Session = Depends(get_db)):
-    db_wallet = crud.update_wallet(db, wallet_id=wallet_id, wallet=wallet)
+def update_wallet(wallet_id: int, wallet: schemas.WalletCreate, db: Session = Depends(get_db), owner_id: Optional[int] = Depends(auth.caller_id)):
+    db_wallet = crud.update_wallet(db, wallet_id=wallet_id, wallet=wallet, owner_id=owner_id)
     if db_wallet is None:
         raise HTTPException(status_code=404, detail="Wallet not found")
     return db_wallet
 
 @router.delete("/wallets/{wallet_id}")
-def delete_wallet(wallet_id: int, db: Session = Depends(get_db)):
-    db_wallet = crud.delete_wallet(db, wallet_id=wallet_id)
+def delete_wallet(wallet_id: int, db: Session = Depends(get_db), owner_id: Optional[int] = Depends(auth.caller_id)):
+    db_wallet = crud.delete_wallet(db, wallet_id=wallet_id, owner_id=owner_id)
     if db_wallet is None:
         raise HTTPException(status_code=404, detail="Wallet not found")
     return {"message": "Wallet deleted successfully"}
@@ -95,64 +128,195 @@ def create_transaction_for_user(user_id: int, transaction: schemas.TransactionCr
     return crud.create_transaction(db=db, transaction=transaction, user_id=user_id)
 
 @router.get("/users/{user_id}/transactions/", response_model=list[schemas.Transaction])
-def read_transactions(user_id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    transactions = crud.get_transactions(db, user_id=user_id, skip=skip, limit=limit)
-    return transactions
+def read_transactions(request: Request, user_id: int, skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                      start_date: Optional[date] = None, end_date: Optional[date] = None, wallet_id: Optional[int] = None,
+                      category_id: Optional[int] = None, type: Optional[str] = None,
+                      min_amount: Optional[float] = None, max_amount: Optional[float] = None, db: Session = Depends(get_replica_db)):
+    def load():
+        return crud.get_transaction_rows(
+            db, user_id=user_id, skip=skip, limit=limit, after=after,
+            start_date=start_date, end_date=end_date, wallet_id=wallet_id, category_id=category_id,
+            type=type, min_amount=min_amount, max_amount=max_amount
+        )
+
+    def headers(transactions):
+        # A full page means there may be more rows; pass the cursor back as ?after= to fetch them
+        if transactions and len(transactions) == limit:
+            return {"X-Next-Cursor": crud.encode_transaction_cursor(transactions[-1])}
+        return None
+
+    # Rows are already shaped like schemas.Transaction; response_model only documents the endpoint
+    return _cached_response(request, user_id, None, load, headers)
+
+@router.get("/users/{user_id}/transactions/search", response_model=list[schemas.TransactionSearchResult])
+def search_transactions(user_id: int, q: str, skip: int = 0, limit: int = 100,
+                        start_date: Optional[date] = None, end_date: Optional[date] = None, wallet_id: Optional[int] = None,
+                        category_id: Optional[int] = None, type: Optional[str] = None, min_amount: Optional[float] = None,
+                        max_amount: Optional[float] = None, db: Session = Depends(get_replica_db)):
+    return fast_json.response(crud.search_transactions(
+        db, user_id=user_id, q=q, skip=skip, limit=limit, start_date=start_date, end_date=end_date, wallet_id=wallet_id,
+        category_id=category_id, type=type, min_amount=min_amount, max_amount=max_amount
+    ))
+
+@router.post("/users/{user_id}/transactions/batch", response_model=schemas.TransactionBatchResult)
+def create_transactions_batch(user_id: int, transactions: list[schemas.TransactionCreate], db: Session = Depends(get_db)):
+    return crud.create_transactions_batch(db, transactions=transactions, user_id=user_id)
+
+@router.delete("/users/{user_id}/transactions/batch", response_model=schemas.TransactionBatchDeleteResult)
+def delete_transactions_batch(user_id: int, batch: schemas.TransactionBatchDelete, db: Session = Depends(get_db)):
+    return crud.delete_transactions_batch(db, transaction_ids=batch.ids, user_id=user_id)
+
+@router.get("/users/{user_id}/transactions/export")
+def export_transactions(user_id: int, format: str = "csv", gzip: bool = False,
+                        start_date: Optional[date] = None, end_date: Optional[date] = None, wallet_id: Optional[int] = None,
+                        category_id: Optional[int] = None, type: Optional[str] = None,
+                        min_amount: Optional[float] = None, max_amount: Optional[float] = None):
+    if format not in exporters.SUPPORTED_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format '{format}'")
+
+    def generate():
+        # The stream outlives the request handler, so it owns its session instead of using get_replica_db
+        db = read_session(user_id)
+        try:
+            rows = crud.stream_transactions(
+                db, user_id=user_id, start_date=start_date, end_date=end_date, wallet_id=wallet_id,
+                category_id=category_id, type=type, min_amount=min_amount, max_amount=max_amount
+            )
+            chunks = exporters.SERIALIZERS[format](rows)
+            if gzip:
+                chunks = exporters.gzip_stream(chunks)
+            yield from chunks
+        finally:
+            db.close()
+
+    filename = f"transactions.{format}{'.gz' if gzip else ''}"
+    media_type = "application/gzip" if gzip else exporters.MEDIA_TYPES[format]
+    return StreamingResponse(generate(), media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@router.post("/users/{user_id}/transactions/import", response_model=schemas.ImportResult)
+def import_transactions_for_user(user_id: int, file: UploadFile = File(...), format: Optional[str] = None,
+                                 wallet_id: Optional[int] = None, db: Session = Depends(get_db)):
+    file_format = importers.detect_format(file.filename, format)
+    if file_format not in importers.SUPPORTED_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported import format '{file_format}'")
+    # Decode the spooled upload lazily so large files are parsed line by line
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", errors="replace", newline="")
+    records = importers.PARSERS[file_format](stream)
+    return crud.import_transactions(db, user_id=user_id, records=records, default_wallet_id=wallet_id)
 
 @router.delete("/transactions/{transaction_id}", response_model=schemas.Transaction)
-def delete_transaction(transaction_id: int, db: Session = Depends(get_db)):
-    db_transaction = crud.delete_transaction(db, transaction_id=transaction_id)
+def delete_transaction(transaction_id: int, db: Session = Depends(get_db), owner_id: Optional[int] = Depends(auth.caller_id)):
+    db_transaction = crud.delete_transaction(db, transaction_id=transaction_id, owner_id=owner_id)
     if db_transaction is None:
         raise HTTPException(status_code=404, detail="Transaction not found")
     return db_transaction
 
+# Analytics endpoints
+@router.get("/users/{user_id}/analytics/summary", response_model=schemas.AnalyticsSummary)
+def read_analytics_summary(user_id: int, start_date: Optional[date] = None, end_date: Optional[date] = None, db: Session = Depends(get_replica_db)):
+    return crud.get_analytics_summary(db, user_id=user_id, start_date=start_date, end_date=end_date)
+
+@router.get("/users/{user_id}/analytics/monthly", response_model=list[schemas.MonthlyTotal])
+def read_monthly_totals(user_id: int, start_date: Optional[date] = None, end_date: Optional[date] = None, db: Session = Depends(get_replica_db)):
+    return crud.get_monthly_totals(db, user_id=user_id, start_date=start_date, end_date=end_date)
+
+@router.get("/users/{user_id}/analytics/categories", response_model=list[schemas.CategoryTotal])
+def read_category_totals(user_id: int, start_date: Optional[date] = None, end_date: Optional[date] = None, type: Optional[str] = None, db: Session = Depends(get_replica_db)):
+    return crud.get_category_totals(db, user_id=user_id, start_date=start_date, end_date=end_date, type=type)
+
+@router.get("/users/{user_id}/analytics/wallets", response_model=list[schemas.WalletTotal])
+def read_wallet_totals(user_id: int, start_date: Optional[date] = None, end_date: Optional[date] = None, db: Session = Depends(get_replica_db)):
+    return crud.get_wallet_totals(db, user_id=user_id, start_date=start_date, end_date=end_date)
+
+# Recurring transaction endpoints
+@router.post("/users/{user_id}/recurring_transactions/", response_model=schemas.RecurringTransaction)
+def create_recurring_transaction_for_user(user_id: int, recurring: schemas.RecurringTransactionCreate, db: Session = Depends(get_db)):
+    return crud.create_recurring_transaction(db=db, recurring=recurring, user_id=user_id)
+
+@router.get("/users/{user_id}/recurring_transactions/", response_model=list[schemas.RecurringTransaction])
+def read_recurring_transactions(user_id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_replica_db)):
+    return crud.get_recurring_transactions(db, user_id=user_id, skip=skip, limit=limit)
+
+@router.delete("/recurring_transactions/{recurring_id}", response_model=schemas.RecurringTransaction)
+def delete_recurring_transaction(recurring_id: int, db: Session = Depends(get_db), owner_id: Optional[int] = Depends(auth.caller_id)):
+    db_recurring = crud.delete_recurring_transaction(db, recurring_id=recurring_id, owner_id=owner_id)
+    if db_recurring is None:
+        raise HTTPException(status_code=404, detail="Recurring transaction not found")
+    return db_recurring
+
+# Dashboard endpoint
+@router.get("/users/{user_id}/dashboard", response_model=schemas.Dashboard)
+def read_dashboard(request: Request, user_id: int, recent: int = crud.DASHBOARD_RECENT_TRANSACTIONS,
+                   largest: int = crud.DASHBOARD_LARGEST_EXPENSES, db: Session = Depends(get_replica_db)):
+    return _cached_response(
+        request, user_id, schemas.Dashboard, lambda: crud.get_dashboard(db, user_id=user_id, recent=recent, largest=largest)
+    )
+
 # Savings Goal endpoints
 @router.post("/users/{user_id}/savings_goals/", response_model=schemas.SavingsGoal)
 def create_savings_goal_for_user(user_id: int, savings_goal: schemas.SavingsGoalCreate, db: Session = Depends(get_db)):
     return crud.create_savings_goal(db=db, savings_goal=savings_goal, user_id=user_id)
 
 @router.get("/users/{user_id}/savings_goals/", response_model=list[schemas.SavingsGoal])
-def read_savings_goals(user_id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    savings_goals = crud.get_savings_goals(db, user_id=user_id, skip=skip, limit=limit)
-    return savings_goals
+def read_savings_goals(request: Request, user_id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_replica_db)):
+    return _cached_response(
+        request, user_id, list[schemas.SavingsGoal], lambda: crud.get_savings_goals(db, user_id=user_id, skip=skip, limit=limit)
+    )
+
+@router.get("/users/{user_id}/savings_goals/summary", response_model=list[schemas.SavingsGoalProgress])
+def read_savings_goals_summary(user_id: int, db: Session = Depends(get_replica_db)):
+    return crud.get_savings_goals_summary(db, user_id=user_id)
 
 @router.put("/savings_goals/{savings_goal_id}", response_model=schemas.SavingsGoal)
-def update_savings_goal(savings_goal_id: int, savings_goal: schemas.SavingsGoalCreate, db: Session = Depends(get_db)):
-    db_savings_goal = crud.update_savings_goal(db, savings_goal_id=savings_goal_id, savings_goal=savings_goal)
+def update_savings_goal(savings_goal_id: int, savings_goal: schemas.SavingsGoalCreate, db: Session = Depends(get_db),
+                        owner_id: Optional[int] = Depends(auth.caller_id)):
+    db_savings_goal = crud.update_savings_goal(db, savings_goal_id=savings_goal_id, savings_goal=savings_goal, owner_id=owner_id)
     if db_savings_goal is None:
         raise HTTPException(status_code=404, detail="Savings goal not found")
     return db_savings_goal
 
 @router.delete("/savings_goals/{savings_goal_id}", response_model=schemas.SavingsGoal)
-def delete_savings_goal(savings_goal_id: int, db: Session = Depends(get_db)):
-    db_savings_goal = crud.delete_savings_goal(db, savings_goal_id=savings_goal_id)
+def delete_savings_goal(savings_goal_id: int, db: Session = Depends(get_db), owner_id: Optional[int] = Depends(auth.caller_id)):
+    db_savings_goal = crud.delete_savings_goal(db, savings_goal_id=savings_goal_id, owner_id=owner_id)
     if db_savings_goal is None:
         raise HTTPException(status_code=404, detail="Savings goal not found")
     return db_savings_goal
 
 # Reference data endpoints
+def _reference_response(name: str, request: Request, skip: int, limit: int):
+    # Served from reference_cache with a validator so clients can revalidate with If-None-Match
+    entry = reference_cache.get(name)
+    etag = f'"{entry.etag}-{skip}-{limit}"'
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={reference_cache.REFERENCE_CACHE_TTL}"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    items = entry.items[skip:skip + limit]
+    return JSONResponse(content=[item.model_dump(mode="json") for item in items], headers=headers)
+
 @router.get("/currencies/", response_model=list[schemas.Currency])
-def read_currencies(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    currencies = db.query(models.Currency).offset(skip).limit(limit).all()
-    return currencies
+@auth.public
+def read_currencies(request: Request, skip: int = 0, limit: int = 100):
+    return _reference_response("currencies", request, skip, limit)
 
 @router.get("/countries/", response_model=list[schemas.Country])
-def read_countries(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    countries = db.query(models.Country).offset(skip).limit(limit).all()
-    return countries
+@auth.public
+def read_countries(request: Request, skip: int = 0, limit: int = 100):
+    return _reference_response("countries", request, skip, limit)
 
 @router.get("/wallet_types/", response_model=list[schemas.WalletType])
-def read_wallet_types(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    wallet_types = db.query(models.WalletType).offset(skip).limit(limit).all()
-    return wallet_types
+@auth.public
+def read_wallet_types(request: Request, skip: int = 0, limit: int = 100):
+    return _reference_response("wallet_types", request, skip, limit)
 
 @router.get("/transaction_categories/", response_model=list[schemas.TransactionCategory])
-def read_transaction_categories(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    categories = db.query(models.TransactionCategory).offset(skip).limit(limit).all()
-    return categories
+@auth.public
+def read_transaction_categories(request: Request, skip: int = 0, limit: int = 100):
+    return _reference_response("transaction_categories", request, skip, limit)
 
 @router.get("/transaction_categories/by_name/{category_name}", response_model=schemas.TransactionCategory)
-def get_transaction_category_by_name(category_name: str, db: Session = Depends(get_db)):
+@auth.public
+def get_transaction_category_by_name(category_name: str, db: Session = Depends(get_replica_db)):
     category = crud.get_transaction_category_by_name(db, category_name=category_name)
     if category is None:
         raise HTTPException(status_code=404, detail=f"Category '{category_name}' not found")
@@ -0,0 +1,172 @@
+# Async routes mounted ahead of api.router when DB_MODE=async
+#
+# These cover the high-traffic user, wallet, transaction, savings goal and analytics paths.
+# Routes not listed here (reference data, import/export, ...) keep being served by api.py.
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from datetime import date
+import async_crud, auth, crud, schemas, user_cache
+from database import get_async_db
+
+router = APIRouter()
+
+async def _cached_response(request: Request, user_id: int, response_model, load, headers=None):
+    # Same per-user read cache as api._cached_response, for coroutine loaders
+    async def render():
+        data = await load()
+        return user_cache.serialize(response_model, data, headers(data) if headers else None)
+    return user_cache.to_response(await user_cache.get_or_load_async(user_id, user_cache.request_key(request), render))
+
+# Authentication endpoints
+@router.post("/login/")
+@auth.public
+async def login(user: schemas.UserLogin, db: AsyncSession = Depends(get_async_db)):
+    db_user = await async_crud.authenticate_user(db, user.email, user.password)
+    if not db_user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    return {
+        "message": "Login successful",
+        "user_id": db_user.id,
+        "email": db_user.email,
+        "access_token": auth.create_access_token(db_user.id, db_user.email),
+        "token_type": "bearer",
+        "expires_in": auth.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    }
+
+# User endpoints
+@router.post("/users/", response_model=schemas.User)
+@auth.public
+async def create_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    db_user = await async_crud.get_user_by_email(db, email=user.email)
+    if db_user:
+        raise HTTPException(status_code=400, detail="Email already registered")
+    return await async_crud.create_user(db=db, user=user)
+
+@router.get("/users/", response_model=list[schemas.User])
+async def read_users(skip: int = 0, limit: int = 100, caller: Optional[int] = Depends(auth.caller_id),
+                     db: AsyncSession = Depends(get_async_db)):
+    return await async_crud.get_users(db, skip=skip, limit=limit, user_id=caller)
+
+@router.get("/users/{user_id}", response_model=schemas.User)
+async def read_user(request: Request, user_id: int, db: AsyncSession = Depends(get_async_db)):
+    async def load():
+        db_user = await async_crud.get_user(db, user_id=user_id)
+        if db_user is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        return db_user
+    return await _cached_response(request, user_id, schemas.User, load)
+
+# Wallet endpoints
+@router.post("/users/{user_id}/wallets/", response_model=schemas.Wallet)
+async def create_wallet_for_user(user_id: int, wallet: schemas.WalletCreate, db: AsyncSession = Depends(get_async_db)):
+    return await async_crud.create_wallet(db=db, wallet=wallet, user_id=user_id)
+
+@router.get("/users/{user_id}/wallets/", response_model=list[schemas.Wallet])
+async def read_wallets(request: Request, user_id: int, skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_db)):
+    return await _cached_response(
+        request, user_id, list[schemas.Wallet], lambda: async_crud.get_wallets(db, user_id=user_id, skip=skip, limit=limit)
+    )
+
+@router.get("/wallets/{wallet_id}", response_model=schemas.Wallet)
+async def read_wallet(wallet_id: int, db: AsyncSession = Depends(get_async_db), owner_id: Optional[int] = Depends(auth.caller_id)):
+    db_wallet = await async_crud.get_wallet(db, wallet_id=wallet_id, owner_id=owner_id)
+    if db_wallet is None:
+        raise HTTPException(status_code=404, detail="Wallet not found")
+    return db_wallet
+
+@router.put("/wallets/{wallet_id}", response_model=schemas.Wallet)
+async def update_wallet(wallet_id: int, wallet: schemas.WalletCreate, db: AsyncSession = Depends(get_async_db),
+                        owner_id: Optional[int] = Depends(auth.caller_id)):
+    db_wallet = await async_crud.update_wallet(db, wallet_id=wallet_id, wallet=wallet, owner_id=owner_id)
+    if db_wallet is None:
+        raise HTTPException(status_code=404, detail="Wallet not found")
+    return db_wallet
+
+@router.delete("/wallets/{wallet_id}")
+async def delete_wallet(wallet_id: int, db: AsyncSession = Depends(get_async_db), owner_id: Optional[int] = Depends(auth.caller_id)):
+    db_wallet = await async_crud.delete_wallet(db, wallet_id=wallet_id, owner_id=owner_id)
+    if db_wallet is None:
+        raise HTTPException(status_code=404, detail="Wallet not found")
+    return {"message": "Wallet deleted successfully"}
+
+# Transfer endpoints
+@router.post("/users/{user_id}/transfer/")
+async def transfer_balance(user_id: int, transfer_data: schemas.TransferRequest, db: AsyncSession = Depends(get_async_db)):
+    try:
+        result = await async_crud.transfer_balance(db, user_id=user_id, transfer_data=transfer_data)
+        return {"message": "Transfer successful", "result": result}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Transaction endpoints
+@router.post("/users/{user_id}/transactions/", response_model=schemas.Transaction)
+async def create_transaction_for_user(user_id: int, transaction: schemas.TransactionCreate, db: AsyncSession = Depends(get_async_db)):
+    return await async_crud.create_transaction(db=db, transaction=transaction, user_id=user_id)
+
+@router.get("/users/{user_id}/transactions/", response_model=list[schemas.Transaction])
+async def read_transactions(request: Request, user_id: int, skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                            start_date: Optional[date] = None, end_date: Optional[date] = None, wallet_id: Optional[int] = None,
+                            category_id: Optional[int] = None, type: Optional[str] = None,
+                            min_amount: Optional[float] = None, max_amount: Optional[float] = None,
+                            db: AsyncSession = Depends(get_async_db)):
+    def load():
+        return async_crud.get_transaction_rows(
+            db, user_id=user_id, skip=skip, limit=limit, after=after,
+            start_date=start_date, end_date=end_date, wallet_id=wallet_id, category_id=category_id,
+            type=type, min_amount=min_amount, max_amount=max_amount
+        )
+
+    def headers(transactions):
+        if transactions and len(transactions) == limit:
+            return {"X-Next-Cursor": crud.encode_transaction_cursor(transactions[-1])}
+        return None
+
+    return await _cached_response(request, user_id, None, load, headers)
+
+@router.delete("/transactions/{transaction_id}", response_model=schemas.Transaction)
+async def delete_transaction(transaction_id: int, db: AsyncSession = Depends(get_async_db), owner_id: Optional[int] = Depends(auth.caller_id)):
+    db_transaction = await async_crud.delete_transaction(db, transaction_id=transaction_id, owner_id=owner_id)
+    if db_transaction is None:
+        raise HTTPException(status_code=404, detail="Transaction not found")
+    return db_transaction
+
+# Analytics endpoints
+@router.get("/users/{user_id}/analytics/summary", response_model=schemas.AnalyticsSummary)
+async def read_analytics_summary(user_id: int, start_date: Optional[date] = None, end_date: Optional[date] = None,
+                                 db: AsyncSession = Depends(get_async_db)):
+    return await async_crud.get_analytics_summary(db, user_id=user_id, start_date=start_date, end_date=end_date)
+
+@router.get("/users/{user_id}/analytics/monthly", response_model=list[schemas.MonthlyTotal])
+async def read_monthly_totals(user_id: int, start_date: Optional[date] = None, end_date: Optional[date] = None,
+                              db: AsyncSession = Depends(get_async_db)):
+    return await async_crud.get_monthly_totals(db, user_id=user_id, start_date=start_date, end_date=end_date)
+
+# Savings Goal endpoints
+@router.post("/users/{user_id}/savings_goals/", response_model=schemas.SavingsGoal)
+async def create_savings_goal_for_user(user_id: int, savings_goal: schemas.SavingsGoalCreate, db: AsyncSession = Depends(get_async_db)):
+    return await async_crud.create_savings_goal(db=db, savings_goal=savings_goal, user_id=user_id)
+
+@router.get("/users/{user_id}/savings_goals/", response_model=list[schemas.SavingsGoal])
+async def read_savings_goals(request: Request, user_id: int, skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_db)):
+    return await _cached_response(
+        request, user_id, list[schemas.SavingsGoal], lambda: async_crud.get_savings_goals(db, user_id=user_id, skip=skip, limit=limit)
+    )
+
+@router.put("/savings_goals/{savings_goal_id}", response_model=schemas.SavingsGoal)
+async def update_savings_goal(savings_goal_id: int, savings_goal: schemas.SavingsGoalCreate, db: AsyncSession = Depends(get_async_db),
+                              owner_id: Optional[int] = Depends(auth.caller_id)):
+    db_savings_goal = await async_crud.update_savings_goal(
+        db, savings_goal_id=savings_goal_id, savings_goal=savings_goal, owner_id=owner_id
+    )
+    if db_savings_goal is None:
+        raise HTTPException(status_code=404, detail="Savings goal not found")
+    return db_savings_goal
+
+@router.delete("/savings_goals/{savings_goal_id}", response_model=schemas.SavingsGoal)
+async def delete_savings_goal(savings_goal_id: int, db: AsyncSession = Depends(get_async_db), owner_id: Optional[int] = Depends(auth.caller_id)):
+    db_savings_goal = await async_crud.delete_savings_goal(db, savings_goal_id=savings_goal_id, owner_id=owner_id)
+    if db_savings_goal is None:
+        raise HTTPException(status_code=404, detail="Savings goal not found")
+    return db_savings_goal
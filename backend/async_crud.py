@@ -0,0 +1,106 @@
+# Async CRUD operations for DB_MODE=async
+#
+# Each function runs the matching crud function on the AsyncSession's greenlet-backed sync
+# session via run_sync, so the query logic lives in one place while the event loop never blocks
+# on PostgreSQL. Results are converted to schemas inside run_sync, because lazy loads are not
+# allowed once control returns to the event loop.
+
+from sqlalchemy.ext.asyncio import AsyncSession
+import crud, schemas, password_hashing
+
+def _to_schema(schema, result):
+    if result is None:
+        return None
+    if isinstance(result, list):
+        return [schema.model_validate(item, from_attributes=True) for item in result]
+    return schema.model_validate(result, from_attributes=True)
+
+async def _run(db: AsyncSession, fn, schema=None, **kwargs):
+    def call(sync_db):
+        result = fn(sync_db, **kwargs)
+        return _to_schema(schema, result) if schema else result
+    return await db.run_sync(call)
+
+# User operations
+async def get_user(db: AsyncSession, user_id: int):
+    return await _run(db, crud.get_user, schemas.User, user_id=user_id)
+
+async def get_user_by_email(db: AsyncSession, email: str):
+    return await _run(db, crud.get_user_by_email, schemas.User, email=email)
+
+async def get_users(db: AsyncSession, skip: int = 0, limit: int = 100, user_id: int = None):
+    return await _run(db, crud.get_users, schemas.User, skip=skip, limit=limit, user_id=user_id)
+
+async def authenticate_user(db: AsyncSession, email: str, password: str):
+    # The argon2 verify is awaited on the hashing pool rather than run inside run_sync,
+    # which would block the event loop for the duration of the hash
+    def load(sync_db):
+        user = crud.get_user_by_email(sync_db, email)
+        return user, _to_schema(schemas.User, user)
+    db_user, result = await db.run_sync(load)
+    if db_user is None:
+        return None
+    valid, new_hash = await password_hashing.verify_and_update_async(password, db_user.password_hash)
+    if not valid:
+        return None
+    if new_hash:
+        db_user.password_hash = new_hash
+        await db.commit()
+    return result
+
+async def create_user(db: AsyncSession, user: schemas.UserCreate):
+    password_hash = await password_hashing.hash_password_async(user.password)
+    return await _run(db, crud.create_user, schemas.User, user=user, password_hash=password_hash)
+
+# Wallet operations
+async def get_wallet(db: AsyncSession, wallet_id: int, owner_id: int = None):
+    return await _run(db, crud.get_wallet, schemas.Wallet, wallet_id=wallet_id, owner_id=owner_id)
+
+async def get_wallets(db: AsyncSession, user_id: int, skip: int = 0, limit: int = 100):
+    return await _run(db, crud.get_wallets, schemas.Wallet, user_id=user_id, skip=skip, limit=limit)
+
+async def create_wallet(db: AsyncSession, wallet: schemas.WalletCreate, user_id: int):
+    return await _run(db, crud.create_wallet, schemas.Wallet, wallet=wallet, user_id=user_id)
+
+async def update_wallet(db: AsyncSession, wallet_id: int, wallet: schemas.WalletCreate, owner_id: int = None):
+    return await _run(db, crud.update_wallet, schemas.Wallet, wallet_id=wallet_id, wallet=wallet, owner_id=owner_id)
+
+async def delete_wallet(db: AsyncSession, wallet_id: int, owner_id: int = None):
+    return await _run(db, crud.delete_wallet, schemas.Wallet, wallet_id=wallet_id, owner_id=owner_id)
+
+# Transaction operations
+async def get_transactions(db: AsyncSession, user_id: int, **filters):
+    return await _run(db, crud.get_transactions, schemas.Transaction, user_id=user_id, **filters)
+
+async def get_transaction_rows(db: AsyncSession, user_id: int, **filters):
+    return await _run(db, crud.get_transaction_rows, user_id=user_id, **filters)
+
+async def create_transaction(db: AsyncSession, transaction: schemas.TransactionCreate, user_id: int):
+    return await _run(db, crud.create_transaction, schemas.Transaction, transaction=transaction, user_id=user_id)
+
+async def delete_transaction(db: AsyncSession, transaction_id: int, owner_id: int = None):
+    return await _run(db, crud.delete_transaction, schemas.Transaction, transaction_id=transaction_id, owner_id=owner_id)
+
+async def transfer_balance(db: AsyncSession, user_id: int, transfer_data: schemas.TransferRequest):
+    return await _run(db, crud.transfer_balance, user_id=user_id, transfer_data=transfer_data)
+
+# Savings Goal operations
+async def get_savings_goals(db: AsyncSession, user_id: int, skip: int = 0, limit: int = 100):
+    return await _run(db, crud.get_savings_goals, schemas.SavingsGoal, user_id=user_id, skip=skip, limit=limit)
+
+async def create_savings_goal(db: AsyncSession, savings_goal: schemas.SavingsGoalCreate, user_id: int):
+    return await _run(db, crud.create_savings_goal, schemas.SavingsGoal, savings_goal=savings_goal, user_id=user_id)
+
+async def update_savings_goal(db: AsyncSession, savings_goal_id: int, savings_goal: schemas.SavingsGoalCreate, owner_id: int = None):
+    return await _run(db, crud.update_savings_goal, schemas.SavingsGoal, savings_goal_id=savings_goal_id, savings_goal=savings_goal,
+                      owner_id=owner_id)
+
+async def delete_savings_goal(db: AsyncSession, savings_goal_id: int, owner_id: int = None):
+    return await _run(db, crud.delete_savings_goal, schemas.SavingsGoal, savings_goal_id=savings_goal_id, owner_id=owner_id)
+
+# Analytics operations
+async def get_analytics_summary(db: AsyncSession, user_id: int, start_date=None, end_date=None):
+    return await _run(db, crud.get_analytics_summary, user_id=user_id, start_date=start_date, end_date=end_date)
+
+async def get_monthly_totals(db: AsyncSession, user_id: int, start_date=None, end_date=None):
+    return await _run(db, crud.get_monthly_totals, schemas.MonthlyTotal, user_id=user_id, start_date=start_date, end_date=end_date)
@@ -0,0 +1,93 @@
+# Stateless access tokens (HS256 JWT) issued at /api/login/
+#
+# Tokens are verified with a single HMAC and no database access; verified tokens are kept in
+# an LRU so repeat requests only pay for a dict lookup and an expiry check.
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+from collections import namedtuple
+from functools import lru_cache
+from fastapi import HTTPException, Request
+
+# Without SECRET_KEY tokens are signed with a per-process key and stop validating on restart
+SECRET_KEY = os.getenv("SECRET_KEY") or secrets.token_urlsafe(32)
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+# When false, requests without a token are still served so existing clients keep working
+AUTH_REQUIRED = os.getenv("AUTH_REQUIRED", "false").lower() == "true"
+
+Principal = namedtuple("Principal", ["user_id", "email", "expires_at"])
+
+_HEADER = {"alg": "HS256", "typ": "JWT"}
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+def _sign(signing_input: str) -> str:
+    return _b64encode(hmac.new(SECRET_KEY.encode(), signing_input.encode(), hashlib.sha256).digest())
+
+def create_access_token(user_id: int, email: str):
+    now = int(time.time())
+    payload = {"sub": str(user_id), "email": email, "iat": now, "exp": now + ACCESS_TOKEN_EXPIRE_MINUTES * 60}
+    signing_input = _b64encode(json.dumps(_HEADER).encode()) + "." + _b64encode(json.dumps(payload).encode())
+    return signing_input + "." + _sign(signing_input)
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def _verify_signature(token: str) -> Principal:
+    try:
+        header, payload, signature = token.split(".")
+        if not hmac.compare_digest(signature, _sign(header + "." + payload)):
+            raise ValueError("Bad signature")
+        claims = json.loads(_b64decode(payload))
+        return Principal(int(claims["sub"]), claims.get("email"), int(claims["exp"]))
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=401, detail="Invalid token", headers={"WWW-Authenticate": "Bearer"})
+
+def decode_access_token(token: str) -> Principal:
+    principal = _verify_signature(token)
+    if principal.expires_at < time.time():
+        raise HTTPException(status_code=401, detail="Token expired", headers={"WWW-Authenticate": "Bearer"})
+    return principal
+
+def get_principal(request: Request):
+    authorization = request.headers.get("authorization")
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(status_code=401, detail="Invalid authorization header", headers={"WWW-Authenticate": "Bearer"})
+    return decode_access_token(token)
+
+def public(endpoint):
+    """Mark a route as open without a token even when AUTH_REQUIRED is set (login, sign-up, reference data)."""
+    endpoint.auth_public = True
+    return endpoint
+
+def authorize_request(request: Request):
+    # Router-level dependency: with AUTH_REQUIRED every route except @public ones needs a token, and any
+    # route with a {user_id} path parameter must belong to the caller. Routes addressed by object id
+    # check ownership in crud through caller_id().
+    principal = get_principal(request)
+    request.state.principal = principal
+    if principal is None:
+        route = request.scope.get("route")
+        if AUTH_REQUIRED and not getattr(getattr(route, "endpoint", None), "auth_public", False):
+            raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+        return None
+    user_id = request.path_params.get("user_id")
+    if user_id is not None and str(principal.user_id) != str(user_id):
+        raise HTTPException(status_code=403, detail="Not allowed to access this user")
+    return principal
+
+def caller_id(request: Request):
+    """The authenticated user's id, for owner checks on routes addressed by object id; None without a token."""
+    principal = getattr(request.state, "principal", None)
+    return principal.user_id if principal is not None else None
\ No newline at end of file
@@ -0,0 +1,6 @@
+# Benchmarks and load tests, run from the backend directory against a scratch DATABASE_URL:
+#   python -m benchmark.generate       seeded synthetic users, wallets and transactions
+#   python -m benchmark.load           async traffic mix with p50/p95/p99 latency per operation
+#   python -m benchmark.report         print or compare saved load results
+#   python -m benchmark.search         description search against an ILIKE scan
+#   python -m benchmark.serialization  list response encoding cost per row
@@ -0,0 +1,189 @@
+# Seeded synthetic data set for benchmarks and load tests
+#
+# Usage: python -m benchmark.generate [--users 1000] [--transactions 1000000] [--seed 42] [--end-date 2025-12-31] [--reset]
+# Bulk-loads users, wallets and transactions into DATABASE_URL with COPY, then creates their monthly partitions
+# and rebuilds the rollups. The same arguments always produce the same rows, so runs against a fresh database
+# are comparable. Users are bench-user-<n>@example.com with password BENCH_PASSWORD; transaction counts per user
+# are skewed the way real ones are, so a few heavy users have far more history than the median. Point
+# DATABASE_URL at a scratch database: --reset empties every user-owned table first.
+
+import argparse
+import csv
+import io
+import json
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from sqlalchemy import text
+from database import SessionLocal
+import crud, partitions, password_hashing, user_cache
+
+BENCH_PASSWORD = "benchmark"
+BENCH_EMAIL = "bench-user-{}@example.com"
+COPY_BATCH_SIZE = 100_000
+HISTORY_DAYS = 730
+
+FIRST_NAMES = ["Aarav", "Maya", "Liam", "Sofia", "Noah", "Amara", "Lucas", "Yuki", "Omar", "Elena", "Kofi", "Priya"]
+LAST_NAMES = ["Patel", "Garcia", "Kim", "Okafor", "Müller", "Rossi", "Nguyen", "Silva", "Cohen", "Haddad", "Ivanova"]
+WALLET_NAMES = ["Everyday", "Savings", "Cash", "Credit Card", "Travel Fund"]
+
+# Used when transaction_categories is empty (seed_data.sql normally provides them)
+DEFAULT_CATEGORIES = [
+    ("Salary", "income", "Regular employment salary"),
+    ("Freelance", "income", "Freelance work income"),
+    ("Food & Dining", "expense", "Groceries, restaurants, cafes"),
+    ("Transportation", "expense", "Fuel, public transport, taxis"),
+    ("Housing", "expense", "Rent, mortgage, utilities"),
+    ("Shopping", "expense", "Clothing, electronics, household items"),
+    ("Entertainment", "expense", "Movies, games, hobbies"),
+]
+# (merchant, typical amount); amounts vary log-normally around the typical value
+EXPENSE_MERCHANTS = [
+    ("Whole Foods Market", 60), ("Starbucks Coffee", 6), ("Uber Trip", 18), ("Shell Fuel Station", 45),
+    ("Amazon Marketplace", 35), ("Netflix Subscription", 15), ("Electric Utility Bill", 90), ("Local Bakery", 8),
+    ("Pharmacy Plus", 22), ("Cinema Tickets", 25), ("Metro Transit", 3), ("Hardware Warehouse", 70),
+    ("Monthly Rent", 1400), ("Airbnb Booking", 320), ("Pizza Palace", 24), ("Gym Membership", 40),
+]
+INCOME_SOURCES = [("Salary", 3800), ("Freelance Invoice", 900), ("Refund", 40), ("Dividend", 120)]
+INCOME_SHARE = 0.08
+
+def _reference_ids(db):
+    ids = {}
+    for table in ("countries", "currencies", "wallet_types"):
+        ids[table] = db.execute(text(f"SELECT id FROM {table} ORDER BY id")).scalars().all() or [None]
+    categories = db.execute(text("SELECT id, type FROM transaction_categories ORDER BY id")).all()
+    if not categories:
+        for name, type, description in DEFAULT_CATEGORIES:
+            db.execute(text(
+                "INSERT INTO transaction_categories (name, type, description) VALUES (:name, :type, :description)"
+            ), {"name": name, "type": type, "description": description})
+        categories = db.execute(text("SELECT id, type FROM transaction_categories ORDER BY id")).all()
+    ids["income"] = [row.id for row in categories if row.type == "income"]
+    ids["expense"] = [row.id for row in categories if row.type == "expense"]
+    return ids
+
+def _reset(db):
+    db.execute(text(
+        "TRUNCATE transactions, wallet_daily_balances, monthly_rollups, recurring_transactions, savings_goals, "
+        "wallets, users RESTART IDENTITY CASCADE"
+    ))
+
+def _copy(db, table: str, columns: tuple, rows: list):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cursor = db.connection().connection.dbapi_connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    finally:
+        cursor.close()
+
+def _transaction_counts(rng, users: int, transactions: int):
+    # Pareto-distributed activity: most users have modest histories, a few have very long ones
+    weights = [rng.paretovariate(1.5) for _ in range(users)]
+    scale = transactions / sum(weights)
+    counts = [int(weight * scale) for weight in weights]
+    counts[0] += transactions - sum(counts)
+    return counts
+
+def _transaction(rng, ids, start: date, wallet_ids: list):
+    day = start + timedelta(days=rng.randrange(HISTORY_DAYS))
+    wallet_id = rng.choice(wallet_ids)
+    if rng.random() < INCOME_SHARE:
+        description, typical = rng.choice(INCOME_SOURCES)
+        type, category_id = "income", rng.choice(ids["income"]) if ids["income"] else ""
+    else:
+        description, typical = rng.choice(EXPENSE_MERCHANTS)
+        type, category_id = "expense", rng.choice(ids["expense"]) if ids["expense"] else ""
+    amount = Decimal(max(typical * rng.lognormvariate(0, 0.5), 0.5)).quantize(Decimal("0.01"))
+    return category_id, amount, day, type, description, wallet_id
+
+def generate(users: int = 1000, transactions: int = 1_000_000, seed: int = 42, end_date: date = date(2025, 12, 31),
+             reset: bool = False):
+    rng = random.Random(seed)
+    start = end_date - timedelta(days=HISTORY_DAYS - 1)
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        if reset:
+            _reset(db)
+        ids = _reference_ids(db)
+        # One hash shared by every generated user, so logins exercise the real verify path
+        password_hash = password_hashing.hash_password(BENCH_PASSWORD)
+
+        user_rows = [{
+            "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            "email": BENCH_EMAIL.format(n),
+            "password_hash": password_hash,
+            "country_id": rng.choice(ids["countries"]),
+            "currency_id": rng.choice(ids["currencies"]),
+        } for n in range(users)]
+        # RETURNING order is not guaranteed to follow the SELECT, so ids are matched back on the natural key
+        inserted = dict(db.execute(text(
+            "INSERT INTO users (name, email, password_hash, country_id, currency_id) "
+            "SELECT name, email, password_hash, country_id, currency_id FROM jsonb_to_recordset(CAST(:rows AS jsonb)) "
+            "AS r(name text, email text, password_hash text, country_id int, currency_id int, n int) "
+            "ORDER BY n RETURNING email, id"
+        ), {"rows": json.dumps([dict(row, n=n) for n, row in enumerate(user_rows)])}).all())
+        user_ids = [inserted[row["email"]] for row in user_rows]
+
+        wallet_rows = []
+        for user_id in user_ids:
+            for name in rng.sample(WALLET_NAMES, rng.randint(1, 4)):
+                wallet_rows.append({"name": name, "type_id": rng.choice(ids["wallet_types"]), "owner_id": user_id})
+        # Names are sampled without replacement, so (owner_id, name) identifies each wallet
+        inserted = {(owner_id, name): wallet_id for wallet_id, owner_id, name in db.execute(text(
+            "INSERT INTO wallets (name, type_id, balance, color, owner_id) "
+            "SELECT name, type_id, 0, '#000000', owner_id FROM jsonb_to_recordset(CAST(:rows AS jsonb)) "
+            "AS r(name text, type_id int, owner_id int, n int) ORDER BY n RETURNING id, owner_id, name"
+        ), {"rows": json.dumps([dict(row, n=n) for n, row in enumerate(wallet_rows)])})}
+        wallet_ids = [inserted[(row["owner_id"], row["name"])] for row in wallet_rows]
+        wallets_by_user = {}
+        for wallet_id, row in zip(wallet_ids, wallet_rows):
+            wallets_by_user.setdefault(row["owner_id"], []).append(wallet_id)
+
+        # Transactions are written in COPY batches so memory stays flat at millions of rows
+        net = dict.fromkeys(wallet_ids, Decimal(0))
+        batch = []
+        for user_id, count in zip(user_ids, _transaction_counts(rng, users, transactions)):
+            for _ in range(count):
+                category_id, amount, day, type, description, wallet_id = _transaction(rng, ids, start, wallets_by_user[user_id])
+                net[wallet_id] += amount if type == "income" else -amount
+                batch.append((category_id, amount, day, type, description, wallet_id, user_id))
+                if len(batch) >= COPY_BATCH_SIZE:
+                    _copy(db, "transactions", ("category_id", "amount", "date", "type", "description", "wallet_id", "owner_id"), batch)
+                    batch = []
+        if batch:
+            _copy(db, "transactions", ("category_id", "amount", "date", "type", "description", "wallet_id", "owner_id"), batch)
+
+        # Opening balances keep every wallet non-negative once its history is applied
+        balances = [(wallet_id, max(Decimal(rng.randrange(500, 5000)), -net[wallet_id] + 100) + net[wallet_id]) for wallet_id in wallet_ids]
+        db.execute(text(
+            "UPDATE wallets SET balance = v.balance FROM unnest(CAST(:ids AS integer[]), CAST(:balances AS numeric[])) "
+            "AS v(id, balance) WHERE wallets.id = v.id"
+        ), {"ids": [row[0] for row in balances], "balances": [row[1] for row in balances]})
+        db.commit()
+        print(f"Loaded {len(user_ids)} users, {len(wallet_ids)} wallets and {transactions} transactions "
+              f"in {time.perf_counter() - started:.1f}s")
+
+        # COPY lands rows for months without a partition in the default one; give them their own
+        partitions.ensure_partitions(db)
+        crud.rebuild_monthly_rollups(db)
+        crud.rebuild_wallet_daily_balances(db)
+        db.execute(text("ANALYZE"))
+        user_cache.clear()
+        print(f"Rebuilt rollups; done in {time.perf_counter() - started:.1f}s")
+        return user_ids
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load a seeded synthetic data set")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--transactions", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--end-date", type=date.fromisoformat, default=date(2025, 12, 31))
+    parser.add_argument("--reset", action="store_true", help="Empty every user-owned table first")
+    args = parser.parse_args()
+    generate(args.users, args.transactions, args.seed, args.end_date, args.reset)
@@ -0,0 +1,169 @@
+# Async load driver replaying a weighted traffic mix against the API
+#
+# Usage: python -m benchmark.load [--url http://localhost:8000 | --in-process] [--duration 60] [--warmup 5]
+#                                 [--concurrency 50] [--users 1000] [--seed 42] [--label name] [--out results.json]
+# Load a data set with benchmark.generate first. Each virtual user logs in as one of the generated users and
+# then issues requests back to back, picking each one from TRAFFIC_MIX. Transactions it creates are the ones
+# it later deletes, so repeated runs leave the data set the same size. --in-process drives main.app through
+# httpx's ASGI transport instead of a server, which measures the application without network or uvicorn.
+# Requests made during the warmup are not recorded. The summary is printed and, with --out, saved for
+# benchmark.report to compare against later runs.
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import time
+from datetime import date, datetime, timezone
+import httpx
+from benchmark import report
+from benchmark.generate import BENCH_EMAIL, BENCH_PASSWORD
+
+# Relative weights of each operation
+TRAFFIC_MIX = {
+    "login": 5,
+    "list_wallets": 20,
+    "list_transactions": 35,
+    "create_transaction": 20,
+    "transfer": 5,
+    "delete_transaction": 15,
+}
+LIST_PAGE_SIZE = 50
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, rng: random.Random, email: str):
+        self.client = client
+        self.rng = rng
+        self.email = email
+        self.user_id = None
+        self.headers = {}  # Bearer token from the last login, sent on every request
+        self.wallet_ids = []
+        self.created = []  # Transactions this user created and has not deleted yet
+
+    async def setup(self):
+        response = await self.login()
+        response.raise_for_status()
+        self.user_id = response.json()["user_id"]
+        response = await self.list_wallets()
+        response.raise_for_status()
+        self.wallet_ids = [wallet["id"] for wallet in response.json()]
+
+    async def login(self):
+        response = await self.client.post("/api/login/", json={"email": self.email, "password": BENCH_PASSWORD})
+        if response.status_code == 200:
+            self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        return response
+
+    def list_wallets(self):
+        return self.client.get(f"/api/users/{self.user_id}/wallets/", headers=self.headers)
+
+    def list_transactions(self):
+        return self.client.get(
+            f"/api/users/{self.user_id}/transactions/", params={"limit": LIST_PAGE_SIZE}, headers=self.headers
+        )
+
+    async def create_transaction(self):
+        response = await self.client.post(f"/api/users/{self.user_id}/transactions/", json={
+            "wallet_id": self.rng.choice(self.wallet_ids),
+            "amount": round(self.rng.uniform(1, 40), 2),
+            "date": date.today().isoformat(),
+            "type": "expense",
+            "description": "Load test purchase",
+        }, headers=self.headers)
+        if response.status_code == 200:
+            self.created.append(response.json()["id"])
+        return response
+
+    def transfer(self):
+        if len(self.wallet_ids) < 2:
+            return self.list_wallets()
+        from_wallet_id, to_wallet_id = self.rng.sample(self.wallet_ids, 2)
+        return self.client.post(f"/api/users/{self.user_id}/transfer/", json={
+            "from_wallet_id": from_wallet_id, "to_wallet_id": to_wallet_id, "amount": 1.0
+        }, headers=self.headers)
+
+    def delete_transaction(self):
+        if not self.created:
+            return self.create_transaction()
+        return self.client.delete(f"/api/transactions/{self.created.pop()}", headers=self.headers)
+
+    async def cleanup(self):
+        while self.created:
+            await self.delete_transaction()
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except OSError:
+        return None
+
+async def _drive(user: VirtualUser, rng: random.Random, record_from: float, stop_at: float, samples: list):
+    operations, weights = list(TRAFFIC_MIX), list(TRAFFIC_MIX.values())
+    while time.perf_counter() < stop_at:
+        operation = rng.choices(operations, weights)[0]
+        started = time.perf_counter()
+        try:
+            response = await getattr(user, operation)()
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        finished = time.perf_counter()
+        if started >= record_from:
+            samples.append((operation, (finished - started) * 1000, ok))
+
+async def run(url: str = "http://localhost:8000", duration: float = 60, warmup: float = 5, concurrency: int = 50,
+              users: int = 1000, seed: int = 42, label: str = None, in_process: bool = False):
+    rng = random.Random(seed)
+    if in_process:
+        import main
+        transport, url = httpx.ASGITransport(app=main.app), "http://benchmark"
+    else:
+        transport = httpx.AsyncHTTPTransport(limits=httpx.Limits(max_connections=concurrency))
+    async with httpx.AsyncClient(base_url=url, transport=transport, timeout=30) as client:
+        virtual_users = [
+            VirtualUser(client, random.Random(rng.random()), BENCH_EMAIL.format(n))
+            for n in rng.sample(range(users), min(concurrency, users))
+        ]
+        await asyncio.gather(*(user.setup() for user in virtual_users))
+
+        samples = []
+        started = time.perf_counter()
+        record_from, stop_at = started + warmup, started + warmup + duration
+        await asyncio.gather(*(
+            _drive(user, random.Random(rng.random()), record_from, stop_at, samples) for user in virtual_users
+        ))
+        measured = time.perf_counter() - record_from
+        await asyncio.gather(*(user.cleanup() for user in virtual_users))
+
+    return {
+        "label": label,
+        "commit": _commit(),
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "url": url,
+        "duration": measured,
+        "warmup": warmup,
+        "concurrency": len(virtual_users),
+        "seed": seed,
+        "mix": TRAFFIC_MIX,
+        "summary": report.summarize(samples, measured),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a traffic mix against the API and report latency")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--in-process", action="store_true", help="Drive main.app directly instead of --url")
+    parser.add_argument("--duration", type=float, default=60, help="Measured seconds, after the warmup")
+    parser.add_argument("--warmup", type=float, default=5)
+    parser.add_argument("--concurrency", type=int, default=50, help="Virtual users issuing requests back to back")
+    parser.add_argument("--users", type=int, default=1000, help="Generated users to pick from (benchmark.generate --users)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--label")
+    parser.add_argument("--out", help="Write the results as JSON for benchmark.report")
+    args = parser.parse_args()
+    result = asyncio.run(run(args.url, args.duration, args.warmup, args.concurrency, args.users, args.seed,
+                             args.label, args.in_process))
+    report.print_summary(result)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,103 @@
+# Latency and throughput reports for benchmark.load results
+#
+# Usage: python -m benchmark.report results.json [--baseline baseline.json] [--threshold 10]
+# Prints p50/p95/p99 latency and throughput per operation. With --baseline, prints the change against an
+# earlier run and exits with status 1 if any operation's p95, p99 or throughput regressed by more than
+# --threshold percent, so it can gate a CI job.
+
+import argparse
+import json
+import math
+import sys
+
+PERCENTILES = (50, 95, 99)
+COMPARED_METRICS = ("p50_ms", "p95_ms", "p99_ms", "throughput")
+GATED_METRICS = ("p95_ms", "p99_ms", "throughput")
+
+def percentile(sorted_values: list, pct: float):
+    # Linear interpolation between the two nearest ranks, as numpy's default does
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * pct / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+def _stats(latencies: list, errors: int, duration: float):
+    latencies = sorted(latencies)
+    stats = {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput": round(len(latencies) / duration, 2) if duration else None,
+        "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else None,
+        "max_ms": round(latencies[-1], 2) if latencies else None,
+    }
+    for pct in PERCENTILES:
+        value = percentile(latencies, pct)
+        stats[f"p{pct}_ms"] = round(value, 2) if value is not None else None
+    return stats
+
+def summarize(samples: list, duration: float):
+    """Summarize (operation, latency_ms, ok) samples taken over duration seconds, per operation and overall."""
+    by_operation = {}
+    for operation, latency, ok in samples:
+        latencies, errors = by_operation.setdefault(operation, ([], [0]))
+        latencies.append(latency)
+        errors[0] += not ok
+    summary = {operation: _stats(latencies, errors[0], duration) for operation, (latencies, errors) in sorted(by_operation.items())}
+    summary["all"] = _stats([latency for _, latency, _ in samples], sum(not ok for _, _, ok in samples), duration)
+    return summary
+
+def _format(value, width: int = 10):
+    return f"{'-':>{width}}" if value is None else f"{value:>{width}.2f}"
+
+def print_summary(result: dict):
+    print(f"{result.get('label') or 'run'}: {result['duration']:.0f}s, concurrency {result['concurrency']}, "
+          f"commit {result.get('commit') or 'unknown'}")
+    print(f"{'operation':<20}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for operation, stats in result["summary"].items():
+        print(f"{operation:<20}{stats['requests']:>10}{stats['errors']:>8}{_format(stats['throughput'])}"
+              f"{_format(stats['p50_ms'])}{_format(stats['p95_ms'])}{_format(stats['p99_ms'])}{_format(stats['max_ms'])}")
+
+def compare(baseline: dict, current: dict, threshold: float = 10.0):
+    """Print the change per operation and return the (operation, metric) pairs that regressed beyond threshold percent."""
+    regressions = []
+    print(f"\nChange against {baseline.get('label') or 'baseline'} (commit {baseline.get('commit') or 'unknown'}):")
+    print(f"{'operation':<20}" + "".join(f"{metric:>14}" for metric in COMPARED_METRICS))
+    for operation, stats in current["summary"].items():
+        before = baseline["summary"].get(operation)
+        if before is None:
+            continue
+        cells = []
+        for metric in COMPARED_METRICS:
+            if not before[metric] or stats[metric] is None:
+                cells.append(f"{'-':>14}")
+                continue
+            change = (stats[metric] - before[metric]) / before[metric] * 100
+            # Latency regresses upwards, throughput downwards
+            worse = -change if metric == "throughput" else change
+            flag = "!" if metric in GATED_METRICS and worse > threshold else " "
+            if flag == "!":
+                regressions.append((operation, metric))
+            cells.append(f"{change:>+12.1f}%{flag}")
+        print(f"{operation:<20}" + "".join(cells))
+    return regressions
+
+def load(path: str):
+    with open(path) as f:
+        return json.load(f)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report and compare benchmark.load results")
+    parser.add_argument("results")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Regression tolerance in percent")
+    args = parser.parse_args()
+    current = load(args.results)
+    print_summary(current)
+    if args.baseline:
+        regressions = compare(load(args.baseline), current, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold}%: "
+                  + ", ".join(f"{operation} {metric}" for operation, metric in regressions))
+            sys.exit(1)
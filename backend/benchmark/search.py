@@ -0,0 +1,77 @@
+# Benchmark description search against a large generated transactions table
+#
+# Usage: python -m benchmark.search [rows] [users]
+# Generates rows transactions spread over users new users (2,000,000 over 200 by default), then times
+# crud.search_transactions for one of them against an ILIKE scan. Point DATABASE_URL at a scratch database.
+
+import random
+import statistics
+import sys
+import time
+from datetime import date
+from sqlalchemy import text
+from database import SessionLocal
+import crud
+
+MERCHANTS = [
+    "Amazon Marketplace", "Starbucks Coffee", "Uber Trip", "Netflix Subscription", "Whole Foods Market",
+    "Shell Fuel Station", "Spotify Premium", "Airbnb Booking", "Apple Store", "Local Bakery",
+    "City Parking", "Electric Utility Bill", "Gym Membership", "Pharmacy Plus", "Book Depot",
+    "Pizza Palace", "Metro Transit", "Cinema Tickets", "Hardware Warehouse", "Blue Bottle Coffee",
+]
+QUERIES = ["coffee", "amaz", "whole foods", "electric bill", "zzznotfound"]
+RUNS = 20
+
+def seed(db, rows: int, users: int):
+    per_user = rows // users
+    user_ids = db.execute(text(
+        "INSERT INTO users (name, email, password_hash, country_id, currency_id) "
+        "SELECT 'Bench ' || g, 'bench-' || g || '-' || :tag || '@example.com', 'x', 1, 1 "
+        "FROM generate_series(1, :users) g RETURNING id"
+    ), {"users": users, "tag": random.getrandbits(32)}).scalars().all()
+    db.execute(text(
+        "INSERT INTO wallets (name, type_id, balance, color, owner_id) "
+        "SELECT 'Bench', 1, 0, '#000000', id FROM unnest(CAST(:ids AS integer[])) id"
+    ), {"ids": user_ids})
+    db.execute(text(
+        "INSERT INTO transactions (amount, date, type, description, wallet_id, owner_id) "
+        "SELECT (g % 500) + 1, date '2020-01-01' + (g % 1800), 'expense', "
+        "(CAST(:merchants AS text[]))[1 + (g * 7919) % :merchant_count] || ' #' || (g % 997), w.id, w.owner_id "
+        "FROM wallets w, generate_series(1, :per_user) g WHERE w.owner_id = ANY(CAST(:ids AS integer[]))"
+    ), {"merchants": MERCHANTS, "merchant_count": len(MERCHANTS), "per_user": per_user, "ids": user_ids})
+    db.commit()
+    db.execute(text("ANALYZE transactions"))
+    return user_ids
+
+def timed(fn):
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), len(result)
+
+def ilike_scan(db, user_id: int, q: str):
+    return db.execute(text(
+        "SELECT id FROM transactions WHERE owner_id = :user_id AND description ILIKE :pattern "
+        "ORDER BY date DESC, id DESC LIMIT 100"
+    ), {"user_id": user_id, "pattern": f"%{q}%"}).all()
+
+def run(rows: int = 2_000_000, users: int = 200):
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        user_ids = seed(db, rows, users)
+        print(f"Seeded {rows} transactions for {users} users in {time.perf_counter() - start:.1f}s")
+        user_id = user_ids[len(user_ids) // 2]
+        print(f"{'query':<16}{'filters':<12}{'search ms':>10}{'rows':>6}{'ilike ms':>10}")
+        for q in QUERIES:
+            for label, filters in (("none", {}), ("2023 only", {"start_date": date(2023, 1, 1), "end_date": date(2023, 12, 31)})):
+                search_ms, found = timed(lambda: crud.search_transactions(db, user_id, q, limit=100, **filters))
+                ilike_ms, _ = timed(lambda: ilike_scan(db, user_id, q)) if not filters else (float("nan"), 0)
+                print(f"{q:<16}{label:<12}{search_ms:>10.2f}{found:>6}{ilike_ms:>10.2f}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:3]))
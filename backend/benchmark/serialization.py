@@ -0,0 +1,78 @@
+# Benchmark list response serialization for a large transactions page
+#
+# Usage: python -m benchmark.serialization [rows]
+# Generates rows transactions (10,000 by default) for a new user, then times fetching and encoding them
+# as one page, per row: the ORM + pydantic path the list endpoints used before, and the row tuple +
+# fast_json path they use now. Point DATABASE_URL at a scratch database.
+
+import json
+import random
+import statistics
+import sys
+import time
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import text
+from database import SessionLocal
+import crud, fast_json, schemas
+
+RUNS = 10
+
+def seed(db, rows: int):
+    user_id = db.execute(text(
+        "INSERT INTO users (name, email, password_hash, country_id, currency_id) "
+        "VALUES ('Bench', 'bench-serialize-' || :tag || '@example.com', 'x', 1, 1) RETURNING id"
+    ), {"tag": random.getrandbits(32)}).scalar_one()
+    wallet_id = db.execute(text(
+        "INSERT INTO wallets (name, type_id, balance, color, owner_id) VALUES ('Bench', 1, 0, '#000000', :user_id) RETURNING id"
+    ), {"user_id": user_id}).scalar_one()
+    db.execute(text(
+        "INSERT INTO transactions (category_id, amount, date, type, description, wallet_id, owner_id) "
+        "SELECT (SELECT min(id) FROM transaction_categories) + g % 2, (g % 500) + 0.99, date '2020-01-01' + (g % 1800), "
+        "'expense', 'Bench purchase #' || g, :wallet_id, :user_id FROM generate_series(1, :rows) g"
+    ), {"wallet_id": wallet_id, "user_id": user_id, "rows": rows})
+    db.commit()
+    db.execute(text("ANALYZE transactions"))
+    return user_id
+
+def timed(fn):
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+def run(rows: int = 10_000):
+    adapter = TypeAdapter(list[schemas.Transaction])
+    db = SessionLocal()
+    try:
+        user_id = seed(db, rows)
+        print(f"Seeded {rows} transactions")
+
+        def load_orm():
+            db.expunge_all()  # Each run builds its ORM objects from scratch, as a request would
+            return crud.get_transactions(db, user_id, limit=rows)
+
+        orm_fetch, transactions = timed(load_orm)
+        row_fetch, transaction_rows = timed(lambda: crud.get_transaction_rows(db, user_id, limit=rows))
+        cases = [
+            # FastAPI before 0.1xx: validate, jsonable_encoder, then the stdlib encoder
+            ("orm + jsonable_encoder + json", orm_fetch,
+             lambda: json.dumps(jsonable_encoder(adapter.validate_python(transactions, from_attributes=True))).encode()),
+            # FastAPI now: validate from attributes, then pydantic-core's encoder
+            ("orm + pydantic dump_json", orm_fetch,
+             lambda: adapter.dump_json(adapter.validate_python(transactions, from_attributes=True))),
+            ("rows + fast_json", row_fetch, lambda: fast_json.dumps(transaction_rows)),
+        ]
+        assert json.loads(cases[1][2]()) == json.loads(cases[2][2]()), "row path output differs from the schema"
+        print(f"{'path':<32}{'fetch us/row':>14}{'encode us/row':>15}{'total ms':>10}")
+        for label, fetch, encode in cases:
+            encode_seconds, _ = timed(encode)
+            print(f"{label:<32}{fetch / rows * 1e6:>14.2f}{encode_seconds / rows * 1e6:>15.2f}{(fetch + encode_seconds) * 1000:>10.1f}")
+        print(f"fast_json backend: {'orjson' if fast_json.orjson else 'json'}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:2]))
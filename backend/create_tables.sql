@@ -10,6 +10,14 @@ CREATE TABLE currencies (
 
 CREATE UNIQUE INDEX currencies_code_key ON currencies USING btree (code);
 
+-- Exchange rates, units of the currency per one FX_BASE_CURRENCY (loaded by fx.py)
+CREATE TABLE fx_rates (
+    currency_id INTEGER NOT NULL REFERENCES currencies(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    rate DECIMAL(18,8) NOT NULL,
+    PRIMARY KEY (currency_id, day)
+);
+
 -- Countries table
 CREATE TABLE countries (
     id SERIAL PRIMARY KEY,
@@ -64,13 +72,14 @@ CREATE TABLE wallets (
     balance DECIMAL(15,2) NOT NULL DEFAULT 0.00,
     color VARCHAR(7) DEFAULT '#000000',
     owner_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+    currency_id INTEGER REFERENCES currencies(id) ON DELETE SET NULL,  -- NULL holds the owner's home currency
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
--- Transactions table
+-- Transactions table, partitioned by month (partitions.py creates transactions_yYYYYmMM partitions)
 CREATE TABLE transactions (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     category_id INTEGER REFERENCES transaction_categories(id) ON DELETE SET NULL,
     amount DECIMAL(15,2) NOT NULL,
     date DATE NOT NULL,
@@ -78,8 +87,13 @@ CREATE TABLE transactions (
     description TEXT,
     wallet_id INTEGER REFERENCES wallets(id) ON DELETE CASCADE,
     owner_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    description_tsv TSVECTOR GENERATED ALWAYS AS (to_tsvector('simple', coalesce(description, ''))) STORED,
+    PRIMARY KEY (id, date)
+) PARTITION BY RANGE (date);
+
+-- Catches rows for months without a partition until partitions.ensure_partitions() moves them out
+CREATE TABLE transactions_default PARTITION OF transactions DEFAULT;
 
 -- Savings goals table
 CREATE TABLE savings_goals (
@@ -97,6 +111,56 @@ CREATE TABLE savings_goals (
     CONSTRAINT savings_goals_savings_type_check CHECK (savings_type IN ('individual', 'linked'))
 );
 
+-- Monthly rollups table (per-month totals maintained on every transaction write)
+CREATE TABLE monthly_rollups (
+    id SERIAL PRIMARY KEY,
+    owner_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    wallet_id INTEGER REFERENCES wallets(id) ON DELETE CASCADE,
+    category_id INTEGER REFERENCES transaction_categories(id) ON DELETE SET NULL,
+    month DATE NOT NULL,
+    type VARCHAR(10) CHECK (type IN ('income', 'expense')) NOT NULL,
+    total DECIMAL(15,2) NOT NULL DEFAULT 0.00,
+    count INTEGER NOT NULL DEFAULT 0
+);
+
+-- Daily net balance change per wallet, for balance history charts
+CREATE TABLE wallet_daily_balances (
+    wallet_id INTEGER NOT NULL REFERENCES wallets(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    net_change DECIMAL(15,2) NOT NULL DEFAULT 0.00,
+    PRIMARY KEY (wallet_id, day)
+);
+
+-- Months of transactions exported to cold storage by partitions.archive_partitions()
+CREATE TABLE transaction_archives (
+    id SERIAL PRIMARY KEY,
+    partition_name VARCHAR(63) NOT NULL,
+    range_start DATE NOT NULL,
+    range_end DATE NOT NULL,
+    row_count INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Recurring transactions table (RRULE-style schedules posted by the scheduler)
+CREATE TABLE recurring_transactions (
+    id SERIAL PRIMARY KEY,
+    owner_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    wallet_id INTEGER NOT NULL REFERENCES wallets(id) ON DELETE CASCADE,
+    category_id INTEGER REFERENCES transaction_categories(id) ON DELETE SET NULL,
+    amount DECIMAL(15,2) NOT NULL,
+    type VARCHAR(10) CHECK (type IN ('income', 'expense')) NOT NULL,
+    description TEXT,
+    rrule VARCHAR(255) NOT NULL,
+    start_date DATE NOT NULL,
+    next_run_at DATE,
+    occurrence_index INTEGER NOT NULL DEFAULT 0,
+    active BOOLEAN NOT NULL DEFAULT TRUE,
+    last_run_at TIMESTAMP,
+    last_error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Create indexes for better performance
 CREATE INDEX idx_users_email ON users(email);
 CREATE INDEX idx_users_country_id ON users(country_id);
@@ -108,7 +172,13 @@ CREATE INDEX idx_transactions_wallet_id ON transactions(wallet_id);
 CREATE INDEX idx_transactions_category_id ON transactions(category_id);
 CREATE INDEX idx_transactions_date ON transactions(date);
 CREATE INDEX idx_transactions_type ON transactions(type);
+CREATE INDEX idx_transactions_owner_date_id ON transactions(owner_id, date, id);
+CREATE INDEX idx_transactions_description_tsv ON transactions USING GIN (description_tsv);
 CREATE INDEX idx_savings_goals_owner_id ON savings_goals(owner_id);
+CREATE INDEX idx_monthly_rollups_owner_month ON monthly_rollups(owner_id, month);
+CREATE INDEX idx_recurring_transactions_due ON recurring_transactions(next_run_at, id) WHERE active;
+CREATE INDEX idx_recurring_transactions_owner_id ON recurring_transactions(owner_id);
+CREATE UNIQUE INDEX uq_monthly_rollups_key ON monthly_rollups(owner_id, COALESCE(wallet_id, 0), COALESCE(category_id, 0), month, type);
 
 -- Create function to update updated_at timestamp
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -1,26 +1,59 @@
-from sqlalchemy.orm import Session
-import models, schemas
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import and_, func, case, tuple_, select, insert, update, delete, cast, Date, Integer
+from sqlalchemy.dialects.postgresql import insert as pg_insert, ARRAY
+import models, schemas, fx, importers, partitions, recurrence, reference_cache, user_cache
 from fastapi import HTTPException
-from datetime import date
+from datetime import date, datetime, timedelta
 from decimal import Decimal
+import base64
+import csv
+import html
+import io
+import re
+
+def _commit(db: Session, *user_ids: int):
+    # Invalidate after the commit: a read that started earlier cached under the old generation,
+    # so it can never be served once the write is visible
+    db.commit()
+    user_cache.invalidate(*user_ids)
+
+def _commit_rebuild(db: Session, user_id: int = None):
+    if user_id is None:
+        db.commit()
+        user_cache.clear()
+    else:
+        _commit(db, user_id)
 
 # User CRUD operations
+# Relationships nested in schemas.User, loaded in the same SELECT to avoid per-row lazy loads
+def _user_options():
+    return (
+        joinedload(models.User.country).joinedload(models.Country.currency),
+        joinedload(models.User.currency),
+    )
+
 def get_user(db: Session, user_id: int):
-    return db.query(models.User).filter(models.User.id == user_id).first()
+    return db.query(models.User).options(*_user_options()).filter(models.User.id == user_id).first()
 
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
-def get_users(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.User).offset(skip).limit(limit).all()
+def get_users(db: Session, skip: int = 0, limit: int = 100, user_id: int = None):
+    # user_id is the authenticated caller, who only gets their own row; None (no token) lists everyone
+    query = db.query(models.User).options(*_user_options())
+    if user_id is not None:
+        query = query.filter(models.User.id == user_id)
+    return query.order_by(models.User.id).offset(skip).limit(limit).all()
 
 def authenticate_user(db: Session, email: str, password: str):
     user = get_user_by_email(db, email)
     if not user or not user.verify_password(password):
         return None
+    if db.is_modified(user):
+        db.commit()  # Persist a hash upgraded to the current argon2 parameters
     return user
 
-def create_user(db: Session, user: schemas.UserCreate):
+def create_user(db: Session, user: schemas.UserCreate, password_hash: str = None):
     db_user = models.User(
         name=user.name,
         email=user.email,
@@ -29,9 +62,14 @@ def create_user(db: Session, user: schemas.UserCreate):
         country_id=user.country_id,
         currency_id=user.currency_id
     )
-    db_user.set_password(user.password)
+    if password_hash:
+        db_user.password_hash = password_hash
+    else:
+        db_user.set_password(user.password)
     db.add(db_user)
-    db.commit()
+    db.flush()
+    # Recorded as the user's first write, so reading the new user back is not sent to a lagging replica
+    _commit(db, db_user.id)
     db.refresh(db_user)
     return db_user
 
@@ -41,43 +79,67 @@ def update_user(db: Session, user_id: int, user_update: schemas.UserCreate):
     if db_user:
         for key, value in user_update.dict(exclude_unset=True).items():
             setattr(db_user, key, value)
-        db.commit()
+        _commit(db, user_id)
         db.refresh(db_user)
     return db_user
 
+def _owned_by(query, model, owner_id: int = None):
+    # owner_id is the authenticated caller; None (no token, AUTH_REQUIRED off) leaves the lookup by id alone
+    return query.filter(model.owner_id == owner_id) if owner_id is not None else query
+
 # Wallet CRUD operations
-def get_wallet(db: Session, wallet_id: int):
-    return db.query(models.Wallet).filter(models.Wallet.id == wallet_id).first()
+def get_wallet(db: Session, wallet_id: int, owner_id: int = None):
+    query = db.query(models.Wallet).options(joinedload(models.Wallet.type)).filter(models.Wallet.id == wallet_id)
+    return _owned_by(query, models.Wallet, owner_id).first()
 
 def get_wallets(db: Session, user_id: int, skip: int = 0, limit: int = 100):
-    return db.query(models.Wallet).filter(models.Wallet.owner_id == user_id).offset(skip).limit(limit).all()
+    return db.query(models.Wallet).options(joinedload(models.Wallet.type)).filter(
+        models.Wallet.owner_id == user_id
+    ).order_by(models.Wallet.id).offset(skip).limit(limit).all()
 
 def create_wallet(db: Session, wallet: schemas.WalletCreate, user_id: int):
     db_wallet = models.Wallet(**wallet.dict(), owner_id=user_id)
     db.add(db_wallet)
-    db.commit()
+    _commit(db, user_id)
     db.refresh(db_wallet)
     return db_wallet
 
-def update_wallet(db: Session, wallet_id: int, wallet: schemas.WalletCreate):
-    db_wallet = db.query(models.Wallet).filter(models.Wallet.id == wallet_id).first()
+def update_wallet(db: Session, wallet_id: int, wallet: schemas.WalletCreate, owner_id: int = None):
+    # Locked so that a transaction or transfer committing meanwhile is neither overwritten by the absolute
+    # balance below nor missing from the delta recorded in the daily balances
+    db_wallet = _owned_by(
+        db.query(models.Wallet).filter(models.Wallet.id == wallet_id), models.Wallet, owner_id
+    ).with_for_update().populate_existing().first()
     if db_wallet:
-        for key, value in wallet.dict().items():
+        # A manual balance edit counts as today's change so earlier history is preserved
+        balance_change = Decimal(str(wallet.balance)) - db_wallet.balance
+        # Clients that predate wallet currencies omit currency_id; keep the stored one
+        for key, value in wallet.dict(exclude_unset=True).items():
             setattr(db_wallet, key, value)
-        db.commit()
+        if balance_change:
+            _apply_balance_changes(db, {(wallet_id, date.today()): balance_change})
+        _commit(db, db_wallet.owner_id)
         db.refresh(db_wallet)
     return db_wallet
 
-def delete_wallet(db: Session, wallet_id: int):
-    db_wallet = db.query(models.Wallet).filter(models.Wallet.id == wallet_id).first()
+def delete_wallet(db: Session, wallet_id: int, owner_id: int = None):
+    db_wallet = _owned_by(db.query(models.Wallet).filter(models.Wallet.id == wallet_id), models.Wallet, owner_id).first()
     if db_wallet:
+        # The wallet's transactions are kept with wallet_id set to NULL, but its rollups cascade away;
+        # move their totals to the user's wallet-less rollups first so month-aligned analytics still count them
+        deltas = {}
+        for rollup in db.query(models.MonthlyRollup).filter(models.MonthlyRollup.wallet_id == wallet_id):
+            _add_rollup_delta(deltas, rollup.owner_id, None, rollup.category_id, rollup.month, rollup.type,
+                              rollup.total, rollup.count)
+        _apply_rollups(db, deltas)
         db.delete(db_wallet)
-        db.commit()
+        _commit(db, db_wallet.owner_id)
     return db_wallet
 
 # Transaction Category CRUD operations
 def get_transaction_category_by_name(db: Session, category_name: str):
-    return db.query(models.TransactionCategory).filter(models.TransactionCategory.name == category_name).first()
+    # Served from the in-process reference cache; db is kept for call-site compatibility
+    return reference_cache.get_transaction_category_by_name(category_name)
 
 def get_transaction_categories(db: Session, skip: int = 0, limit: int = 100):
     return db.query(models.TransactionCategory).offset(skip).limit(limit).all()
@@ -86,61 +148,921 @@ def get_transaction_categories(db: Session, skip: int = 0, limit: int = 100):
 def get_transaction(db: Session, transaction_id: int):
     return db.query(models.Transaction).filter(models.Transaction.id == transaction_id).first()
 
-def get_transactions(db: Session, user_id: int, skip: int = 0, limit: int = 100):
-    return db.query(models.Transaction).filter(models.Transaction.owner_id == user_id).offset(skip).limit(limit).all()
+def encode_transaction_cursor(transaction):
+    # Accepts a models.Transaction or a row dict from get_transaction_rows
+    if isinstance(transaction, dict):
+        transaction_date, transaction_id = transaction["date"], transaction["id"]
+    else:
+        transaction_date, transaction_id = transaction.date, transaction.id
+    raw = f"{transaction_date.isoformat()}|{transaction_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_transaction_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        cursor_date, cursor_id = raw.split("|")
+        return date.fromisoformat(cursor_date), int(cursor_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _filter_transactions(query, user_id: int, start_date: date = None, end_date: date = None, wallet_id: int = None,
+                         category_id: int = None, type: str = None, min_amount: float = None, max_amount: float = None):
+    query = query.filter(models.Transaction.owner_id == user_id)
+    if start_date:
+        query = query.filter(models.Transaction.date >= start_date)
+    if end_date:
+        query = query.filter(models.Transaction.date <= end_date)
+    if wallet_id is not None:
+        query = query.filter(models.Transaction.wallet_id == wallet_id)
+    if category_id is not None:
+        query = query.filter(models.Transaction.category_id == category_id)
+    if type:
+        query = query.filter(models.Transaction.type == type)
+    if min_amount is not None:
+        query = query.filter(models.Transaction.amount >= min_amount)
+    if max_amount is not None:
+        query = query.filter(models.Transaction.amount <= max_amount)
+    return query
+
+def _seek_transactions(query, skip: int, limit: int, after: str):
+    # Newest first, with id as a tie-breaker so pages are stable (served by idx_transactions_owner_date_id)
+    if after:
+        # Keyset pagination: seek past the last row of the previous page instead of scanning skipped rows
+        cursor_date, cursor_id = decode_transaction_cursor(after)
+        query = query.filter(tuple_(models.Transaction.date, models.Transaction.id) < tuple_(cursor_date, cursor_id))
+        # Redundant with the row comparison, but partition pruning only understands plain bounds on date
+        query = query.filter(models.Transaction.date <= cursor_date)
+        skip = 0
+    query = query.order_by(models.Transaction.date.desc(), models.Transaction.id.desc())
+    return query.offset(skip).limit(limit)
+
+def get_transactions(db: Session, user_id: int, skip: int = 0, limit: int = 100, after: str = None,
+                     start_date: date = None, end_date: date = None, wallet_id: int = None, category_id: int = None,
+                     type: str = None, min_amount: float = None, max_amount: float = None):
+    query = _filter_transactions(
+        db.query(models.Transaction).options(joinedload(models.Transaction.category)), user_id, start_date, end_date, wallet_id, category_id, type, min_amount, max_amount
+    )
+    return _seek_transactions(query, skip, limit, after).all()
+
+# Columns of schemas.Transaction, fetched as plain tuples for the list endpoints
+TRANSACTION_ROW_COLUMNS = (
+    models.Transaction.id,
+    models.Transaction.category_id,
+    models.Transaction.amount,
+    models.Transaction.date,
+    models.Transaction.type,
+    models.Transaction.description,
+    models.Transaction.wallet_id,
+    models.Transaction.owner_id,
+    models.TransactionCategory.name.label("category_name"),
+    models.TransactionCategory.type.label("category_type"),
+    models.TransactionCategory.description.label("category_description"),
+)
+
+def _transaction_row(row):
+    # Same shape as schemas.Transaction, without building ORM objects or validating them
+    return {
+        "category_id": row.category_id,
+        "amount": float(row.amount),
+        "date": row.date,
+        "type": row.type,
+        "description": row.description,
+        "id": row.id,
+        "category": None if row.category_id is None else {
+            "name": row.category_name,
+            "type": row.category_type,
+            "description": row.category_description,
+            "id": row.category_id,
+        },
+        "wallet_id": row.wallet_id,
+        "owner_id": row.owner_id,
+    }
+
+def get_transaction_rows(db: Session, user_id: int, skip: int = 0, limit: int = 100, after: str = None,
+                         start_date: date = None, end_date: date = None, wallet_id: int = None, category_id: int = None,
+                         type: str = None, min_amount: float = None, max_amount: float = None):
+    """get_transactions as JSON-ready dicts, for responses encoded with fast_json."""
+    query = _filter_transactions(
+        db.query(*TRANSACTION_ROW_COLUMNS).outerjoin(models.Transaction.category),
+        user_id, start_date, end_date, wallet_id, category_id, type, min_amount, max_amount
+    )
+    return [_transaction_row(row) for row in _seek_transactions(query, skip, limit, after)]
+
+# Description search
+SEARCH_CONFIG = "simple"  # No stemming or stop words, which suits merchant names
+# ts_headline marks matches with private-use characters; the description is HTML-escaped before they become <mark> tags
+SEARCH_MATCH_START, SEARCH_MATCH_STOP = "\ue000", "\ue001"
+SEARCH_HIGHLIGHT_OPTIONS = f"StartSel={SEARCH_MATCH_START}, StopSel={SEARCH_MATCH_STOP}, HighlightAll=true"
+
+def build_search_query(text: str):
+    # Every word must match, each as a prefix so partial merchant names ("amaz") still find results.
+    # Only word characters reach to_tsquery, so user input cannot inject tsquery operators.
+    terms = re.findall(r"\w+", text.lower())
+    return " & ".join(f"{term}:*" for term in terms)
+
+def _highlight_markup(headline: str):
+    if headline is None:
+        return None
+    # html.escape leaves the sentinels alone, so only they can turn into tags
+    return html.escape(headline).replace(SEARCH_MATCH_START, "<mark>").replace(SEARCH_MATCH_STOP, "</mark>")
+
+def search_transactions(db: Session, user_id: int, q: str, skip: int = 0, limit: int = 100,
+                        start_date: date = None, end_date: date = None, wallet_id: int = None, category_id: int = None,
+                        type: str = None, min_amount: float = None, max_amount: float = None):
+    search_query = build_search_query(q)
+    if not search_query:
+        raise HTTPException(status_code=400, detail="Search query must contain at least one word")
+    tsquery = func.to_tsquery(SEARCH_CONFIG, search_query)
+    rank = func.ts_rank_cd(models.Transaction.description_tsv, tsquery)
+    # PostgreSQL evaluates ts_headline after the LIMIT, so only returned rows pay for highlighting
+    # Sentinel characters already in a description are removed so that only real matches are marked
+    description = func.translate(models.Transaction.description, SEARCH_MATCH_START + SEARCH_MATCH_STOP, "")
+    highlight = func.ts_headline(SEARCH_CONFIG, description, tsquery, SEARCH_HIGHLIGHT_OPTIONS)
+    query = _filter_transactions(
+        db.query(*TRANSACTION_ROW_COLUMNS, rank.label("rank"), highlight.label("highlight")).outerjoin(models.Transaction.category),
+        user_id, start_date, end_date, wallet_id, category_id, type, min_amount, max_amount
+    ).filter(models.Transaction.description_tsv.op("@@")(tsquery))
+    rows = query.order_by(rank.desc(), models.Transaction.date.desc(), models.Transaction.id.desc()).offset(skip).limit(limit)
+    results = []
+    for row in rows:
+        result = _transaction_row(row)
+        result.update(rank=row.rank, highlight=_highlight_markup(row.highlight))
+        results.append(result)
+    return results
+
+EXPORT_BATCH_SIZE = 1000
+
+def stream_transactions(db: Session, user_id: int, start_date: date = None, end_date: date = None, wallet_id: int = None,
+                        category_id: int = None, type: str = None, min_amount: float = None, max_amount: float = None):
+    # Plain column tuples fetched through a server-side cursor, so memory stays flat regardless of row count
+    stmt = select(
+        models.Transaction.id,
+        models.Transaction.date,
+        models.Transaction.type,
+        models.Transaction.amount,
+        models.Transaction.description,
+        models.Transaction.wallet_id,
+        models.Transaction.category_id,
+        models.TransactionCategory.name.label("category_name")
+    ).outerjoin(models.TransactionCategory, models.Transaction.category_id == models.TransactionCategory.id)
+    stmt = _filter_transactions(stmt, user_id, start_date, end_date, wallet_id, category_id, type, min_amount, max_amount)
+    stmt = stmt.order_by(models.Transaction.date.desc(), models.Transaction.id.desc())
+    result = db.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    for partition in result.partitions():
+        yield from partition
+
+def _adjust_wallet_balance(db: Session, wallet_id: int, delta: Decimal, owner_id: int = None, allow_negative: bool = False):
+    # Single-statement read-modify-write; unless allow_negative, a debit only applies if it leaves the
+    # balance non-negative, so concurrent writers on one wallet can neither lose updates nor overdraw it.
+    # Returns the new balance, or None if the wallet is missing or has insufficient funds.
+    stmt = update(models.Wallet).where(models.Wallet.id == wallet_id)
+    if owner_id is not None:
+        stmt = stmt.where(models.Wallet.owner_id == owner_id)
+    if delta < 0 and not allow_negative:
+        stmt = stmt.where(models.Wallet.balance >= -delta)
+    stmt = stmt.values(balance=models.Wallet.balance + delta).returning(models.Wallet.balance)
+    return db.execute(stmt.execution_options(synchronize_session=False)).scalar_one_or_none()
 
 def create_transaction(db: Session, transaction: schemas.TransactionCreate, user_id: int):
-    # Get the wallet to validate balance for expense transactions
-    wallet = db.query(models.Wallet).filter(
-        models.Wallet.id == transaction.wallet_id,
-        models.Wallet.owner_id == user_id
-    ).first()
-    
-    if not wallet:
-        raise HTTPException(status_code=404, detail="Wallet not found")
+    amount_decimal = Decimal(str(transaction.amount))
+    delta = -amount_decimal if transaction.type == 'expense' else amount_decimal
     
-    # Validate balance for expense transactions
-    if transaction.type == 'expense':
-        amount_decimal = Decimal(str(transaction.amount))
-        if wallet.balance < amount_decimal:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Insufficient balance. Current balance: ${wallet.balance}, Required: ${transaction.amount}"
-            )
+    # Update wallet balance, validating ownership and (for expenses) funds in the same statement
+    if _adjust_wallet_balance(db, transaction.wallet_id, delta, owner_id=user_id) is None:
+        db.rollback()
+        wallet = db.query(models.Wallet).filter(
+            models.Wallet.id == transaction.wallet_id,
+            models.Wallet.owner_id == user_id
+        ).first()
+        if not wallet:
+            raise HTTPException(status_code=404, detail="Wallet not found")
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Insufficient balance. Current balance: ${wallet.balance}, Required: ${transaction.amount}"
+        )
     
     # Create the transaction
     db_transaction = models.Transaction(**transaction.dict(), owner_id=user_id)
     db.add(db_transaction)
     
-    # Update wallet balance
-    amount_decimal = Decimal(str(transaction.amount))
-    if transaction.type == 'expense':
-        wallet.balance -= amount_decimal
-    else:  # income
-        wallet.balance += amount_decimal
+    _apply_rollup(db, user_id, transaction.wallet_id, transaction.category_id, transaction.date, transaction.type, amount_decimal)
     
-    db.commit()
+    _commit(db, user_id)
     db.refresh(db_transaction)
     return db_transaction
 
-def delete_transaction(db: Session, transaction_id: int):
-    db_transaction = db.query(models.Transaction).filter(models.Transaction.id == transaction_id).first()
+def delete_transaction(db: Session, transaction_id: int, owner_id: int = None):
+    query = db.query(models.Transaction).options(joinedload(models.Transaction.category)).filter(
+        models.Transaction.id == transaction_id
+    )
+    db_transaction = _owned_by(query, models.Transaction, owner_id).first()
     if db_transaction:
-        # Get the wallet to restore balance
-        wallet = db.query(models.Wallet).filter(models.Wallet.id == db_transaction.wallet_id).first()
+        # Delete first: only the request whose DELETE removes the row goes on to restore the balance
+        deleted = db.execute(
+            delete(models.Transaction).where(models.Transaction.id == transaction_id).returning(models.Transaction.id)
+            .execution_options(synchronize_session=False)
+        ).scalar_one_or_none()
+        if deleted is None:
+            db.rollback()
+            return None
         
-        if wallet:
+        if db_transaction.wallet_id is not None:
             # Restore the balance (opposite of what was done when created)
             amount_decimal = db_transaction.amount
-            if db_transaction.type == 'expense':
-                wallet.balance += amount_decimal  # Restore what was subtracted
-            else:  # income
-                wallet.balance -= amount_decimal  # Subtract what was added
+            delta = amount_decimal if db_transaction.type == 'expense' else -amount_decimal
+            _adjust_wallet_balance(db, db_transaction.wallet_id, delta, allow_negative=True)
         
-        db.delete(db_transaction)
-        db.commit()
+        _apply_rollup(
+            db, db_transaction.owner_id, db_transaction.wallet_id, db_transaction.category_id,
+            db_transaction.date, db_transaction.type, -db_transaction.amount, count=-1
+        )
+        
+        # The row is already gone; detach so commit doesn't try to reload it for the response
+        db.expunge(db_transaction)
+        _commit(db, db_transaction.owner_id)
     return db_transaction
 
+# Batch operations
+BATCH_MAX_SIZE = 1000
+
+def create_transactions_batch(db: Session, transactions: list, user_id: int):
+    if len(transactions) > BATCH_MAX_SIZE:
+        raise HTTPException(status_code=400, detail=f"Batch too large (max {BATCH_MAX_SIZE} transactions)")
+
+    # Validate every row before touching the database
+    wallet_ids = {transaction.wallet_id for transaction in transactions}
+    owned_wallet_ids = {
+        row.id for row in db.query(models.Wallet.id).filter(
+            models.Wallet.id.in_(wallet_ids),
+            models.Wallet.owner_id == user_id
+        )
+    }
+    category_ids = {category.id for category in reference_cache.get("transaction_categories").items}
+    errors = []
+    rows = []
+    for index, transaction in enumerate(transactions):
+        if transaction.type not in ('income', 'expense'):
+            errors.append({"row": index, "error": f"Invalid type '{transaction.type}'"})
+        elif transaction.amount <= 0:
+            errors.append({"row": index, "error": "Amount must be positive"})
+        elif transaction.wallet_id not in owned_wallet_ids:
+            errors.append({"row": index, "error": "Wallet not found"})
+        elif transaction.category_id is not None and transaction.category_id not in category_ids:
+            errors.append({"row": index, "error": f"Category {transaction.category_id} not found"})
+        else:
+            row = transaction.dict()
+            row["amount"] = Decimal(str(transaction.amount))
+            rows.append(row)
+    if errors:
+        raise HTTPException(status_code=400, detail=errors)
+
+    ids = _insert_transactions(db, user_id, rows) if rows else []
+    _commit(db, user_id)
+    return {"ids": ids}
+
+def delete_transactions_batch(db: Session, transaction_ids: list, user_id: int):
+    if len(transaction_ids) > BATCH_MAX_SIZE:
+        raise HTTPException(status_code=400, detail=f"Batch too large (max {BATCH_MAX_SIZE} transactions)")
+
+    deleted = db.execute(
+        delete(models.Transaction).where(
+            models.Transaction.id.in_(transaction_ids),
+            models.Transaction.owner_id == user_id
+        ).returning(
+            models.Transaction.id,
+            models.Transaction.wallet_id,
+            models.Transaction.category_id,
+            models.Transaction.date,
+            models.Transaction.type,
+            models.Transaction.amount
+        ).execution_options(synchronize_session=False)
+    ).all()
+
+    balance_deltas = {}
+    rollup_deltas = {}
+    for row in deleted:
+        _add_rollup_delta(rollup_deltas, user_id, row.wallet_id, row.category_id, row.date, row.type, -row.amount, count=-1)
+        if row.wallet_id is not None:
+            # Restore the balance (opposite of what was done when created)
+            restore = row.amount if row.type == 'expense' else -row.amount
+            balance_deltas[row.wallet_id] = balance_deltas.get(row.wallet_id, Decimal("0")) + restore
+    for wallet_id, delta in sorted(balance_deltas.items()):
+        _adjust_wallet_balance(db, wallet_id, delta, allow_negative=True)
+    _apply_rollups(db, rollup_deltas)
+    _commit(db, user_id)
+    return {"deleted": [row.id for row in deleted]}
+
+# Bulk import operations
+IMPORT_BATCH_SIZE = 1000
+IMPORT_MAX_ERRORS = 1000
+IMPORT_MAX_AMOUNT = Decimal(10) ** 13  # transactions.amount is DECIMAL(15,2)
+
+def _parse_import_row(fields: dict, wallet_ids: set, category_ids: set, categories_by_name: dict, default_wallet_id: int = None):
+    fields = {key: (value or "").strip() for key, value in fields.items() if key}
+
+    if not fields.get("date"):
+        raise ValueError("Missing date")
+    transaction_date = importers.parse_date(fields["date"])
+
+    try:
+        amount = Decimal(fields.get("amount", "").replace(",", ""))
+    except ArithmeticError:
+        raise ValueError(f"Invalid amount '{fields.get('amount', '')}'")
+    if not amount.is_finite():
+        raise ValueError(f"Invalid amount '{fields.get('amount', '')}'")
+    # Rounded before the checks, so amounts that round to 0.00 are rejected rather than stored as zero
+    amount = amount.quantize(Decimal("0.01"))
+    if abs(amount) >= IMPORT_MAX_AMOUNT:
+        raise ValueError(f"Amount '{fields.get('amount', '')}' is too large")
+
+    type = fields.get("type", "").lower()
+    if type:
+        if type not in ("income", "expense"):
+            raise ValueError(f"Invalid type '{type}'")
+        if amount <= 0:
+            raise ValueError("Amount must be positive when type is given")
+    else:
+        # Bank exports use signed amounts: negative is money out
+        if amount == 0:
+            raise ValueError("Amount cannot be zero")
+        type = "expense" if amount < 0 else "income"
+        amount = abs(amount)
+
+    wallet_id = int(fields["wallet_id"]) if fields.get("wallet_id") else default_wallet_id
+    if wallet_id not in wallet_ids:
+        raise ValueError("Wallet not found")
+
+    category_id = None
+    if fields.get("category_id"):
+        category_id = int(fields["category_id"])
+        if category_id not in category_ids:
+            raise ValueError(f"Category {category_id} not found")
+    elif fields.get("category"):
+        category_id = categories_by_name.get(fields["category"].lower())
+        if category_id is None:
+            raise ValueError(f"Category '{fields['category']}' not found")
+
+    return {
+        "category_id": category_id,
+        "amount": amount,
+        "date": transaction_date,
+        "type": type,
+        "description": fields.get("description") or None,
+        "wallet_id": wallet_id
+    }
+
+TRANSACTION_COPY_COLUMNS = ("category_id", "amount", "date", "type", "description", "wallet_id", "owner_id", "created_at")
+
+def _copy_transactions(db: Session, rows: list):
+    # COPY ... FROM STDIN through the session's psycopg2 connection; far cheaper per row than INSERT
+    # COPY bypasses the ORM-side created_at default, so stamp it here
+    created_at = datetime.now()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        row["created_at"] = created_at
+        writer.writerow([row[column] for column in TRANSACTION_COPY_COLUMNS])
+    buffer.seek(0)
+    cursor = db.connection().connection.dbapi_connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY transactions ({', '.join(TRANSACTION_COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+    finally:
+        cursor.close()
+
+def _insert_transactions(db: Session, user_id: int, rows: list, check_balance: bool = True, copy: bool = False):
+    # Insert validated rows with one multi-row INSERT (or COPY) and one balance UPDATE per wallet, without committing.
+    # With check_balance, each wallet's net debit must be covered or the whole batch is rejected.
+    # Returns the new ids, except with copy, which does not report them.
+    balance_deltas = {}
+    rollup_deltas = {}
+    for row in rows:
+        row["owner_id"] = user_id
+        signed_amount = row["amount"] if row["type"] == "income" else -row["amount"]
+        balance_deltas[row["wallet_id"]] = balance_deltas.get(row["wallet_id"], Decimal("0")) + signed_amount
+        _add_rollup_delta(rollup_deltas, user_id, row["wallet_id"], row["category_id"], row["date"], row["type"], row["amount"])
+
+    # Wallets are updated in id order so concurrent batches lock rows in the same order
+    for wallet_id, delta in sorted(balance_deltas.items()):
+        if _adjust_wallet_balance(db, wallet_id, delta, allow_negative=not check_balance) is None:
+            db.rollback()
+            raise HTTPException(status_code=400, detail=f"Insufficient balance in wallet {wallet_id}")
+    ids = None
+    if copy:
+        _copy_transactions(db, rows)
+    else:
+        # render_nulls keeps rows with and without NULL columns in the same multi-row INSERT;
+        # sort_by_parameter_order makes the returned ids line up with the input rows
+        stmt = insert(models.Transaction).returning(
+            models.Transaction.id, sort_by_parameter_order=True
+        ).execution_options(render_nulls=True)
+        ids = db.execute(stmt, rows).scalars().all()
+    _apply_rollups(db, rollup_deltas)
+    return ids
+
+def _insert_import_batch(db: Session, user_id: int, rows: list):
+    _insert_transactions(db, user_id, rows, check_balance=False, copy=True)
+    _commit(db, user_id)
+
+def import_transactions(db: Session, user_id: int, records, default_wallet_id: int = None):
+    # Note: imported history is applied to wallet balances without the insufficient-balance check
+    wallet_ids = {row.id for row in db.query(models.Wallet.id).filter(models.Wallet.owner_id == user_id)}
+    categories = reference_cache.get("transaction_categories").items
+    category_ids = {category.id for category in categories}
+    categories_by_name = {category.name.lower(): category.id for category in categories}
+
+    imported = 0
+    failed = 0
+    errors = []
+    batch = []
+    for row_number, fields in records:
+        try:
+            batch.append(_parse_import_row(fields, wallet_ids, category_ids, categories_by_name, default_wallet_id))
+        except (ValueError, ArithmeticError) as e:
+            failed += 1
+            if len(errors) < IMPORT_MAX_ERRORS:
+                errors.append({"row": row_number, "error": str(e)})
+            continue
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            _insert_import_batch(db, user_id, batch)
+            imported += len(batch)
+            batch = []
+    if batch:
+        _insert_import_batch(db, user_id, batch)
+        imported += len(batch)
+
+    return {"imported": imported, "failed": failed, "errors": errors}
+
+# Monthly rollup and daily balance maintenance
+def _apply_rollups(db: Session, deltas: dict):
+    # Upsert into monthly_rollups and wallet_daily_balances within the caller's DB transaction.
+    # deltas maps (owner_id, wallet_id, category_id, date, type) -> (amount, count); negative values reverse.
+    if not deltas:
+        return
+    monthly = {}
+    daily = {}
+    for (owner_id, wallet_id, category_id, transaction_date, type), (amount, count) in deltas.items():
+        key = (owner_id, wallet_id, category_id, transaction_date.replace(day=1), type)
+        total, total_count = monthly.get(key, (Decimal("0"), 0))
+        monthly[key] = (total + amount, total_count + count)
+        if wallet_id is not None:
+            signed_amount = amount if type == "income" else -amount
+            daily[(wallet_id, transaction_date)] = daily.get((wallet_id, transaction_date), Decimal("0")) + signed_amount
+
+    stmt = pg_insert(models.MonthlyRollup).values([
+        {
+            "owner_id": owner_id,
+            "wallet_id": wallet_id,
+            "category_id": category_id,
+            "month": month,
+            "type": type,
+            "total": amount,
+            "count": count
+        }
+        for (owner_id, wallet_id, category_id, month, type), (amount, count) in monthly.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=models.MONTHLY_ROLLUP_KEY,
+        set_={
+            "total": models.MonthlyRollup.total + stmt.excluded.total,
+            "count": models.MonthlyRollup.count + stmt.excluded.count
+        }
+    )
+    db.execute(stmt)
+    _apply_balance_changes(db, daily)
+
+def _apply_balance_changes(db: Session, changes: dict):
+    # changes maps (wallet_id, day) -> signed amount; rows are upserted in key order so concurrent
+    # writers lock them in the same order
+    if not changes:
+        return
+    stmt = pg_insert(models.WalletDailyBalance).values([
+        {"wallet_id": wallet_id, "day": day, "net_change": amount}
+        for (wallet_id, day), amount in sorted(changes.items())
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.WalletDailyBalance.wallet_id, models.WalletDailyBalance.day],
+        set_={"net_change": models.WalletDailyBalance.net_change + stmt.excluded.net_change}
+    )
+    db.execute(stmt)
+
+def _add_rollup_delta(deltas: dict, owner_id: int, wallet_id: int, category_id: int, transaction_date: date,
+                      type: str, amount: Decimal, count: int = 1):
+    key = (owner_id, wallet_id, category_id, transaction_date, type)
+    total, total_count = deltas.get(key, (Decimal("0"), 0))
+    deltas[key] = (total + amount, total_count + count)
+
+def _apply_rollup(db: Session, owner_id: int, wallet_id: int, category_id: int, transaction_date: date,
+                  type: str, amount: Decimal, count: int = 1):
+    deltas = {}
+    _add_rollup_delta(deltas, owner_id, wallet_id, category_id, transaction_date, type, amount, count)
+    _apply_rollups(db, deltas)
+
+def rebuild_monthly_rollups(db: Session, user_id: int = None):
+    # Months archived by partitions.archive_partitions() are no longer in transactions; their rollups are kept
+    archived_until = partitions.archived_until(db)
+    delete_query = db.query(models.MonthlyRollup)
+    if user_id is not None:
+        delete_query = delete_query.filter(models.MonthlyRollup.owner_id == user_id)
+    if archived_until is not None:
+        delete_query = delete_query.filter(models.MonthlyRollup.month >= archived_until)
+    delete_query.delete(synchronize_session=False)
+
+    month = func.date_trunc('month', models.Transaction.date).cast(Date)
+    select_stmt = select(
+        models.Transaction.owner_id,
+        models.Transaction.wallet_id,
+        models.Transaction.category_id,
+        month,
+        models.Transaction.type,
+        func.sum(models.Transaction.amount),
+        func.count(models.Transaction.id)
+    ).group_by(
+        models.Transaction.owner_id,
+        models.Transaction.wallet_id,
+        models.Transaction.category_id,
+        month,
+        models.Transaction.type
+    )
+    if user_id is not None:
+        select_stmt = select_stmt.where(models.Transaction.owner_id == user_id)
+    else:
+        select_stmt = select_stmt.where(models.Transaction.owner_id.isnot(None))
+    if archived_until is not None:
+        select_stmt = select_stmt.where(models.Transaction.date >= archived_until)
+
+    result = db.execute(insert(models.MonthlyRollup).from_select(
+        ["owner_id", "wallet_id", "category_id", "month", "type", "total", "count"],
+        select_stmt
+    ))
+    _commit_rebuild(db, user_id)
+    return result.rowcount
+
+def rebuild_wallet_daily_balances(db: Session, user_id: int = None):
+    # Only transaction history can be replayed; manual balance edits made before this table existed are lost,
+    # and days archived by partitions.archive_partitions() are kept as they are
+    archived_until = partitions.archived_until(db)
+    delete_query = db.query(models.WalletDailyBalance)
+    if user_id is not None:
+        delete_query = delete_query.filter(
+            models.WalletDailyBalance.wallet_id.in_(select(models.Wallet.id).where(models.Wallet.owner_id == user_id))
+        )
+    if archived_until is not None:
+        delete_query = delete_query.filter(models.WalletDailyBalance.day >= archived_until)
+    delete_query.delete(synchronize_session=False)
+
+    signed_amount = case((models.Transaction.type == 'income', models.Transaction.amount), else_=-models.Transaction.amount)
+    select_stmt = select(
+        models.Transaction.wallet_id,
+        models.Transaction.date,
+        func.sum(signed_amount)
+    ).where(models.Transaction.wallet_id.isnot(None)).group_by(models.Transaction.wallet_id, models.Transaction.date)
+    if user_id is not None:
+        select_stmt = select_stmt.where(models.Transaction.owner_id == user_id)
+    if archived_until is not None:
+        select_stmt = select_stmt.where(models.Transaction.date >= archived_until)
+
+    result = db.execute(insert(models.WalletDailyBalance).from_select(["wallet_id", "day", "net_change"], select_stmt))
+    _commit_rebuild(db, user_id)
+    return result.rowcount
+
+# Balance history operations
+BALANCE_INTERVALS = ("day", "week", "month")
+
+def _period_start(day: date, interval: str):
+    if interval == "week":
+        return day - timedelta(days=day.weekday())
+    if interval == "month":
+        return day.replace(day=1)
+    return day
+
+def get_balance_history(db: Session, wallet_id: int, start_date: date = None, end_date: date = None, interval: str = "day",
+                        owner_id: int = None):
+    """Closing balance per day, week or month, from the wallet's current balance and its daily changes.
+
+    Returns None if the wallet does not exist. Every period between start_date and end_date is
+    present, so the result can be charted directly.
+    """
+    if interval not in BALANCE_INTERVALS:
+        raise HTTPException(status_code=400, detail=f"interval must be one of {', '.join(BALANCE_INTERVALS)}")
+    balance = _owned_by(db.query(models.Wallet.balance).filter(models.Wallet.id == wallet_id), models.Wallet, owner_id).scalar()
+    if balance is None:
+        return None
+    end_date = end_date or date.today()
+
+    # One range read on the (wallet_id, day) primary key; changes after end_date unwind the current balance
+    query = db.query(models.WalletDailyBalance.day, models.WalletDailyBalance.net_change).filter(
+        models.WalletDailyBalance.wallet_id == wallet_id
+    )
+    if start_date is not None:
+        query = query.filter(models.WalletDailyBalance.day >= start_date)
+    changes = query.order_by(models.WalletDailyBalance.day).all()
+    if start_date is None:
+        start_date = changes[0].day if changes else end_date
+    if start_date > end_date:
+        return []
+
+    # Balance at the start of start_date, then walk forward closing each period
+    balance -= sum((row.net_change for row in changes), Decimal("0"))
+    changes_by_day = {row.day: row.net_change for row in changes}
+    history = []
+    day = start_date
+    while day <= end_date:
+        balance += changes_by_day.get(day, 0)
+        next_day = day + timedelta(days=1)
+        if next_day > end_date or _period_start(next_day, interval) != _period_start(day, interval):
+            history.append({"date": _period_start(day, interval), "balance": balance})
+        day = next_day
+    return history
+
+# Analytics operations
+# Totals are in the user's home currency; amounts from wallets in other currencies are converted in SQL
+class _AnalyticsSource:
+    def __init__(self, model, date_column, month, amount, count, conversion=None):
+        self.model = model
+        self.date_column = date_column
+        self.month = month
+        self.amount = conversion.amount(amount, model.wallet_id, date_column) if conversion else amount
+        self.count = count
+        self.conversion = conversion
+
+    def sum(self, expression):
+        return self.conversion.sum(expression) if self.conversion else func.sum(expression)
+
+def _is_month_aligned(start_date: date = None, end_date: date = None):
+    if start_date and start_date.day != 1:
+        return False
+    if end_date and (end_date + timedelta(days=1)).day != 1:
+        return False
+    return True
+
+def _wallet_currencies(db: Session, user_id: int):
+    """The user's home currency, and {wallet_id: currency_id} for their wallets with a currency of their own."""
+    rows = db.query(models.User.currency_id, models.Wallet.id, models.Wallet.currency_id).outerjoin(
+        models.Wallet, and_(models.Wallet.owner_id == models.User.id, models.Wallet.currency_id.isnot(None))
+    ).filter(models.User.id == user_id).all()
+    home_currency_id = rows[0][0] if rows else None
+    return home_currency_id, {wallet_id: currency_id for _, wallet_id, currency_id in rows if wallet_id is not None}
+
+def _analytics_source(db: Session, user_id: int, start_date: date = None, end_date: date = None):
+    # Whole-month ranges are answered from monthly_rollups, converted at each month's average rate;
+    # arbitrary day ranges fall back to raw transactions, converted at each day's rate
+    home_currency_id, wallet_currencies = _wallet_currencies(db, user_id)
+    if _is_month_aligned(start_date, end_date):
+        rollup = models.MonthlyRollup
+        conversion = fx.monthly_conversion(db, wallet_currencies, home_currency_id, start_date, end_date)
+        source = _AnalyticsSource(
+            rollup, rollup.month, rollup.month, rollup.total, func.coalesce(func.sum(rollup.count), 0), conversion
+        )
+    else:
+        transaction = models.Transaction
+        conversion = fx.daily_conversion(db, wallet_currencies, home_currency_id, start_date, end_date)
+        source = _AnalyticsSource(
+            transaction,
+            transaction.date,
+            func.date_trunc('month', transaction.date).cast(Date),
+            transaction.amount,
+            func.count(transaction.id),
+            conversion
+        )
+    return source, home_currency_id
+
+def _filter_user_rows(query, source: _AnalyticsSource, user_id: int, start_date: date = None, end_date: date = None):
+    query = query.filter(source.model.owner_id == user_id)
+    if source.model is models.MonthlyRollup:
+        # Rollups emptied by deletes are left in place with a zero count
+        query = query.filter(models.MonthlyRollup.count > 0)
+    if start_date:
+        query = query.filter(source.date_column >= start_date)
+    if end_date:
+        query = query.filter(source.date_column <= end_date)
+    return query
+
+def _income_sum(source: _AnalyticsSource):
+    return func.coalesce(source.sum(case((source.model.type == 'income', source.amount), else_=0)), 0)
+
+def _expense_sum(source: _AnalyticsSource):
+    return func.coalesce(source.sum(case((source.model.type == 'expense', source.amount), else_=0)), 0)
+
+def get_analytics_summary(db: Session, user_id: int, start_date: date = None, end_date: date = None):
+    source, home_currency_id = _analytics_source(db, user_id, start_date, end_date)
+    query = db.query(
+        _income_sum(source).label("income"),
+        _expense_sum(source).label("expense"),
+        source.count.label("count")
+    )
+    row = _filter_user_rows(query, source, user_id, start_date, end_date).one()
+    return {
+        "income": row.income,
+        "expense": row.expense,
+        "net": row.income - row.expense,
+        "count": row.count,
+        "currency_id": home_currency_id
+    }
+
+def get_monthly_totals(db: Session, user_id: int, start_date: date = None, end_date: date = None):
+    source, _ = _analytics_source(db, user_id, start_date, end_date)
+    month = source.month.label("month")
+    query = db.query(
+        month,
+        _income_sum(source).label("income"),
+        _expense_sum(source).label("expense"),
+        source.count.label("count")
+    )
+    query = _filter_user_rows(query, source, user_id, start_date, end_date)
+    return query.group_by(month).order_by(month).all()
+
+def get_category_totals(db: Session, user_id: int, start_date: date = None, end_date: date = None, type: str = None):
+    source, _ = _analytics_source(db, user_id, start_date, end_date)
+    model = source.model
+    total = source.sum(source.amount)
+    query = db.query(
+        model.category_id,
+        models.TransactionCategory.name.label("category_name"),
+        model.type,
+        total.label("total"),
+        source.count.label("count")
+    ).outerjoin(models.TransactionCategory, model.category_id == models.TransactionCategory.id)
+    query = _filter_user_rows(query, source, user_id, start_date, end_date)
+    if type:
+        query = query.filter(model.type == type)
+    return query.group_by(
+        model.category_id,
+        models.TransactionCategory.name,
+        model.type
+    ).order_by(total.desc()).all()
+
+def get_wallet_totals(db: Session, user_id: int, start_date: date = None, end_date: date = None):
+    source, _ = _analytics_source(db, user_id, start_date, end_date)
+    model = source.model
+    query = db.query(
+        model.wallet_id,
+        _income_sum(source).label("income"),
+        _expense_sum(source).label("expense"),
+        source.count.label("count")
+    )
+    query = _filter_user_rows(query, source, user_id, start_date, end_date)
+    return query.group_by(model.wallet_id).order_by(model.wallet_id).all()
+
+# Recurring transaction operations
+RECURRING_BATCH_SIZE = 1000
+RECURRING_MAX_CATCH_UP = 366  # Occurrences posted per schedule per batch when catching up after downtime
+
+def get_recurring_transactions(db: Session, user_id: int, skip: int = 0, limit: int = 100):
+    return db.query(models.RecurringTransaction).filter(
+        models.RecurringTransaction.owner_id == user_id
+    ).order_by(models.RecurringTransaction.id).offset(skip).limit(limit).all()
+
+def create_recurring_transaction(db: Session, recurring: schemas.RecurringTransactionCreate, user_id: int):
+    if recurring.type not in ('income', 'expense'):
+        raise HTTPException(status_code=400, detail=f"Invalid type '{recurring.type}'")
+    if recurring.amount <= 0:
+        raise HTTPException(status_code=400, detail="Amount must be positive")
+    try:
+        rule = recurrence.parse_rrule(recurring.rrule)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid rrule: {e}")
+    wallet = db.query(models.Wallet).filter(
+        models.Wallet.id == recurring.wallet_id,
+        models.Wallet.owner_id == user_id
+    ).first()
+    if not wallet:
+        raise HTTPException(status_code=404, detail="Wallet not found")
+
+    finished = recurrence.is_finished(rule, 0, recurring.start_date)
+    db_recurring = models.RecurringTransaction(
+        **recurring.dict(),
+        owner_id=user_id,
+        next_run_at=None if finished else recurring.start_date,
+        occurrence_index=0,
+        active=not finished
+    )
+    db.add(db_recurring)
+    _commit(db, user_id)
+    db.refresh(db_recurring)
+    return db_recurring
+
+def delete_recurring_transaction(db: Session, recurring_id: int, owner_id: int = None):
+    query = db.query(models.RecurringTransaction).filter(models.RecurringTransaction.id == recurring_id)
+    db_recurring = _owned_by(query, models.RecurringTransaction, owner_id).first()
+    if db_recurring:
+        db.delete(db_recurring)
+        _commit(db, db_recurring.owner_id)
+    return db_recurring
+
+def _due_schedules(db: Session, today: date, after: tuple = None, limit: int = RECURRING_BATCH_SIZE):
+    # Walks the partial (next_run_at, id) index; SKIP LOCKED lets several scheduler processes split the work
+    query = db.query(models.RecurringTransaction).filter(
+        models.RecurringTransaction.active.is_(True),
+        models.RecurringTransaction.next_run_at <= today
+    )
+    if after is not None:
+        query = query.filter(tuple_(models.RecurringTransaction.next_run_at, models.RecurringTransaction.id) > after)
+    return query.order_by(
+        models.RecurringTransaction.next_run_at, models.RecurringTransaction.id
+    ).limit(limit).with_for_update(skip_locked=True).all()
+
+def post_recurring_batch(db: Session, schedules: list, today: date):
+    """Post every occurrence due by today for the given locked schedules and advance them, in one commit.
+
+    Balances move through the same conditional per-wallet UPDATE as create_transaction, so a wallet that
+    cannot cover its net debit fails all of its schedules in the batch; they keep their next_run_at and
+    are retried on a later run. Because the posted rows and the advanced next_run_at commit together,
+    re-running after a crash never posts an occurrence twice.
+    """
+    rows = []
+    balance_deltas = {}
+    rollup_deltas = {}
+    advances = {}
+    for schedule in schedules:
+        rule = recurrence.parse_rrule(schedule.rrule)
+        index, run_date = schedule.occurrence_index, schedule.next_run_at
+        schedule_rows = []
+        while run_date <= today and len(schedule_rows) < RECURRING_MAX_CATCH_UP:
+            if recurrence.is_finished(rule, index, run_date):
+                break
+            schedule_rows.append({
+                "owner_id": schedule.owner_id,
+                "wallet_id": schedule.wallet_id,
+                "category_id": schedule.category_id,
+                "amount": schedule.amount,
+                "type": schedule.type,
+                "description": schedule.description,
+                "date": run_date,
+            })
+            index += 1
+            run_date = recurrence.occurrence(schedule.start_date, rule, index)
+        advances[schedule.id] = (schedule_rows, index, None if recurrence.is_finished(rule, index, run_date) else run_date)
+        for row in schedule_rows:
+            signed_amount = row["amount"] if row["type"] == "income" else -row["amount"]
+            balance_deltas[row["wallet_id"]] = balance_deltas.get(row["wallet_id"], Decimal("0")) + signed_amount
+
+    # Wallets are updated in id order so concurrent writers lock rows in the same order
+    failed_wallets = {
+        wallet_id for wallet_id, delta in sorted(balance_deltas.items())
+        if _adjust_wallet_balance(db, wallet_id, delta) is None
+    }
+
+    advanced = []
+    failed_ids = []
+    for schedule in schedules:
+        schedule_rows, index, next_run_at = advances[schedule.id]
+        if schedule.wallet_id in failed_wallets:
+            failed_ids.append(schedule.id)
+            continue
+        for row in schedule_rows:
+            _add_rollup_delta(rollup_deltas, row["owner_id"], row["wallet_id"], row["category_id"], row["date"], row["type"], row["amount"])
+        rows.extend(schedule_rows)
+        advanced.append((schedule.id, index, next_run_at))
+
+    if rows:
+        db.execute(insert(models.Transaction).execution_options(render_nulls=True), rows)
+        _apply_rollups(db, rollup_deltas)
+    # One UPDATE ... FROM unnest(arrays) instead of a per-schedule UPDATE from the unit of work
+    if advanced:
+        ids, indexes, next_run_dates = zip(*advanced)
+        positions = func.unnest(
+            cast(list(ids), ARRAY(Integer)), cast(list(indexes), ARRAY(Integer)), cast(list(next_run_dates), ARRAY(Date))
+        ).table_valued("id", "occurrence_index", "next_run_at").render_derived(name="positions")
+        db.execute(
+            update(models.RecurringTransaction)
+            .where(models.RecurringTransaction.id == positions.c.id)
+            .values(
+                occurrence_index=positions.c.occurrence_index,
+                next_run_at=positions.c.next_run_at,
+                active=positions.c.next_run_at.is_not(None),
+                last_run_at=func.now(),
+                last_error=None
+            ).execution_options(synchronize_session=False)
+        )
+    if failed_ids:
+        db.execute(
+            update(models.RecurringTransaction)
+            .where(models.RecurringTransaction.id.in_(failed_ids))
+            .values(last_error="Insufficient balance")
+            .execution_options(synchronize_session=False)
+        )
+    _commit(db, *{schedule.owner_id for schedule in schedules})
+    return len(rows), len(failed_ids)
+
+def run_recurring_transactions(db: Session, today: date = None, batch_size: int = RECURRING_BATCH_SIZE):
+    today = today or date.today()
+    totals = {"schedules": 0, "posted": 0, "failed": 0}
+    after = None
+    while True:
+        schedules = _due_schedules(db, today, after=after, limit=batch_size)
+        if not schedules:
+            break
+        # Keyset on the pre-run position so failed schedules are not retried within this run
+        after = (schedules[-1].next_run_at, schedules[-1].id)
+        posted, failed = post_recurring_batch(db, schedules, today)
+        totals["schedules"] += len(schedules)
+        totals["posted"] += posted
+        totals["failed"] += failed
+    return totals
+
 # Savings Goal CRUD operations
 def get_savings_goal(db: Session, savings_goal_id: int):
     return db.query(models.SavingsGoal).filter(models.SavingsGoal.id == savings_goal_id).first()
@@ -148,55 +1070,183 @@ def get_savings_goal(db: Session, savings_goal_id: int):
 def get_savings_goals(db: Session, user_id: int, skip: int = 0, limit: int = 100):
     return db.query(models.SavingsGoal).filter(models.SavingsGoal.owner_id == user_id).offset(skip).limit(limit).all()
 
+SAVINGS_RATE_WINDOW_DAYS = 90  # Linked goals project from the wallet's net change over this window
+DAYS_PER_MONTH = Decimal("30.4375")
+
+def get_savings_goals_summary(db: Session, user_id: int, today: date = None):
+    today = today or date.today()
+    window_start = today - timedelta(days=SAVINGS_RATE_WINDOW_DAYS)
+    # Recent net change of the linked wallet, read from wallet_daily_balances in the same statement
+    recent_change = select(func.sum(models.WalletDailyBalance.net_change)).where(
+        models.WalletDailyBalance.wallet_id == models.SavingsGoal.linked_wallet_id,
+        models.WalletDailyBalance.day > window_start,
+        models.WalletDailyBalance.day <= today
+    ).scalar_subquery()
+    rows = db.query(models.SavingsGoal, recent_change).filter(
+        models.SavingsGoal.owner_id == user_id
+    ).order_by(models.SavingsGoal.id).all()
+
+    summary = []
+    for goal, wallet_change in rows:
+        goal_amount = goal.goal_amount
+        current_amount = goal.current_amount or Decimal("0")
+        remaining = max(goal_amount - current_amount, Decimal("0"))
+
+        if goal.savings_type == "linked" and goal.linked_balance is not None:
+            monthly_rate = (wallet_change or Decimal("0")) * DAYS_PER_MONTH / SAVINGS_RATE_WINDOW_DAYS
+        elif goal.created_at is not None:
+            # Individual goals have no history, so assume steady saving since the goal was created
+            days_active = max((today - goal.created_at.date()).days, 1)
+            monthly_rate = current_amount * DAYS_PER_MONTH / days_active
+        else:
+            monthly_rate = None
+
+        required_monthly_rate = None
+        if goal.target_date is not None:
+            months_left = Decimal((goal.target_date - today).days) / DAYS_PER_MONTH
+            required_monthly_rate = remaining / months_left if months_left > 1 else remaining
+
+        projected_completion_date = None
+        if remaining == 0:
+            projected_completion_date = today
+        elif monthly_rate and monthly_rate > 0:
+            projected_completion_date = today + timedelta(days=int(remaining / monthly_rate * DAYS_PER_MONTH) + 1)
+
+        summary.append({
+            "id": goal.id,
+            "name": goal.name,
+            "savings_type": goal.savings_type,
+            "linked_wallet_id": goal.linked_wallet_id,
+            "goal_amount": goal_amount,
+            "current_amount": current_amount,
+            "remaining_amount": remaining,
+            "progress_percent": current_amount / goal_amount * 100 if goal_amount else 100,
+            "target_date": goal.target_date,
+            "monthly_rate": monthly_rate,
+            "required_monthly_rate": required_monthly_rate,
+            "projected_completion_date": projected_completion_date,
+        })
+    return summary
+
 def create_savings_goal(db: Session, savings_goal: schemas.SavingsGoalCreate, user_id: int):
     db_savings_goal = models.SavingsGoal(**savings_goal.dict(), owner_id=user_id)
     db.add(db_savings_goal)
-    db.commit()
+    _commit(db, user_id)
     db.refresh(db_savings_goal)
     return db_savings_goal
 
-def update_savings_goal(db: Session, savings_goal_id: int, savings_goal: schemas.SavingsGoalCreate):
-    db_savings_goal = db.query(models.SavingsGoal).filter(models.SavingsGoal.id == savings_goal_id).first()
+def update_savings_goal(db: Session, savings_goal_id: int, savings_goal: schemas.SavingsGoalCreate, owner_id: int = None):
+    query = db.query(models.SavingsGoal).filter(models.SavingsGoal.id == savings_goal_id)
+    db_savings_goal = _owned_by(query, models.SavingsGoal, owner_id).first()
     if db_savings_goal:
         for key, value in savings_goal.dict().items():
             setattr(db_savings_goal, key, value)
-        db.commit()
+        _commit(db, db_savings_goal.owner_id)
         db.refresh(db_savings_goal)
     return db_savings_goal
 
-def delete_savings_goal(db: Session, savings_goal_id: int):
-    db_savings_goal = db.query(models.SavingsGoal).filter(models.SavingsGoal.id == savings_goal_id).first()
+def delete_savings_goal(db: Session, savings_goal_id: int, owner_id: int = None):
+    query = db.query(models.SavingsGoal).filter(models.SavingsGoal.id == savings_goal_id)
+    db_savings_goal = _owned_by(query, models.SavingsGoal, owner_id).first()
     if db_savings_goal:
         db.delete(db_savings_goal)
-        db.commit()
+        _commit(db, db_savings_goal.owner_id)
     return db_savings_goal
 
+# Dashboard operations
+DASHBOARD_RECENT_TRANSACTIONS = 10
+DASHBOARD_LARGEST_EXPENSES = 5
+
+def get_dashboard(db: Session, user_id: int, recent: int = DASHBOARD_RECENT_TRANSACTIONS,
+                  largest: int = DASHBOARD_LARGEST_EXPENSES, today: date = None):
+    # A fixed five queries however much history the user has (plus loading the rate table once it expires)
+    today = today or date.today()
+    month_start = today.replace(day=1)
+    home_currency = select(models.User.currency_id).where(models.User.id == user_id).scalar_subquery()
+    rows = db.query(models.Wallet, home_currency).options(joinedload(models.Wallet.type)).filter(
+        models.Wallet.owner_id == user_id
+    ).order_by(models.Wallet.id).all()
+    wallets = [wallet for wallet, _ in rows]
+    home_currency_id = rows[0][1] if rows else None
+    # Amounts from wallets in other currencies are converted at each transaction's date
+    conversion = fx.daily_conversion(db, {wallet.id: wallet.currency_id for wallet in wallets}, home_currency_id, month_start, today)
+    amount = models.Transaction.amount
+    if conversion:
+        amount = conversion.amount(amount, models.Transaction.wallet_id, models.Transaction.date)
+    total = conversion.sum if conversion else func.sum
+
+    month_totals = db.query(
+        func.coalesce(total(case((models.Transaction.type == 'income', amount))), 0),
+        func.coalesce(total(case((models.Transaction.type == 'expense', amount))), 0)
+    )
+    largest_expenses = db.query(models.Transaction).options(joinedload(models.Transaction.category))
+    month_income, month_expense = month_totals.filter(
+        models.Transaction.owner_id == user_id,
+        models.Transaction.date >= month_start,
+        models.Transaction.date <= today
+    ).one()
+    largest_expenses = largest_expenses.filter(
+        models.Transaction.owner_id == user_id,
+        models.Transaction.type == 'expense',
+        models.Transaction.date >= month_start,
+        models.Transaction.date <= today
+    ).order_by(amount.desc(), models.Transaction.id.desc()).limit(largest).all()
+    return {
+        "wallets": wallets,
+        "currency_id": home_currency_id,
+        "total_balance": sum((
+            fx.convert(db, wallet.balance, wallet.currency_id or home_currency_id, home_currency_id, today)
+            for wallet in wallets
+        ), Decimal("0")),
+        "recent_transactions": get_transactions(db, user_id=user_id, limit=recent),
+        "month_start": month_start,
+        "month_income": month_income,
+        "month_expense": month_expense,
+        "savings_rate": (month_income - month_expense) / month_income * 100 if month_income else None,
+        "largest_expenses": largest_expenses,
+        "savings_goals": get_savings_goals_summary(db, user_id=user_id, today=today),
+    }
+
 # Transfer operations
 def transfer_balance(db: Session, user_id: int, transfer_data: schemas.TransferRequest):
-    # Get source and destination wallets
-    from_wallet = db.query(models.Wallet).filter(
-        models.Wallet.id == transfer_data.from_wallet_id,
-        models.Wallet.owner_id == user_id
-    ).first()
+    if transfer_data.from_wallet_id == transfer_data.to_wallet_id:
+        raise HTTPException(status_code=400, detail="Source and destination wallets cannot be the same")
     
-    to_wallet = db.query(models.Wallet).filter(
-        models.Wallet.id == transfer_data.to_wallet_id,
+    # Lock both wallets in one SELECT ... FOR UPDATE, always in id order so that
+    # opposite-direction transfers between the same pair cannot deadlock
+    wallets = db.query(models.Wallet).filter(
+        models.Wallet.id.in_([transfer_data.from_wallet_id, transfer_data.to_wallet_id]),
         models.Wallet.owner_id == user_id
-    ).first()
+    ).order_by(models.Wallet.id).with_for_update().all()
+    wallets_by_id = {wallet.id: wallet for wallet in wallets}
+    from_wallet = wallets_by_id.get(transfer_data.from_wallet_id)
+    to_wallet = wallets_by_id.get(transfer_data.to_wallet_id)
     
     if not from_wallet or not to_wallet:
+        db.rollback()
         raise HTTPException(status_code=404, detail="Wallet not found")
     
-    if from_wallet.id == to_wallet.id:
-        raise HTTPException(status_code=400, detail="Source and destination wallets cannot be the same")
-    
-    if from_wallet.balance < transfer_data.amount:
+    if from_wallet.balance < Decimal(str(transfer_data.amount)):
+        db.rollback()
         raise HTTPException(status_code=400, detail="Insufficient balance in source wallet")
     
-    # Update wallet balances
     amount_decimal = Decimal(str(transfer_data.amount))
+    to_amount = amount_decimal
+    if from_wallet.currency_id != to_wallet.currency_id:
+        # The destination receives the amount converted at today's rate
+        home_currency_id = db.query(models.User.currency_id).filter(models.User.id == user_id).scalar()
+        try:
+            to_amount = fx.convert(
+                db, amount_decimal, from_wallet.currency_id or home_currency_id, to_wallet.currency_id or home_currency_id,
+                date.today()
+            )
+        except HTTPException:
+            db.rollback()
+            raise
+    
+    # Update wallet balances
     from_wallet.balance -= amount_decimal
-    to_wallet.balance += amount_decimal
+    to_wallet.balance += to_amount
     
     # Create transfer transactions
     from_transaction = models.Transaction(
@@ -211,7 +1261,7 @@ def transfer_balance(db: Session, user_id: int, transfer_data: schemas.TransferR
     
     to_transaction = models.Transaction(
         category_id=None,
-        amount=amount_decimal,
+        amount=to_amount,
         date=date.today(),
         type='income',
         description=f"Transfer from {from_wallet.name}{f' - {transfer_data.description}' if transfer_data.description else ''}",
@@ -221,11 +1271,14 @@ def transfer_balance(db: Session, user_id: int, transfer_data: schemas.TransferR
     
     db.add(from_transaction)
     db.add(to_transaction)
-    db.commit()
+    _apply_rollup(db, user_id, from_wallet.id, None, from_transaction.date, 'expense', amount_decimal)
+    _apply_rollup(db, user_id, to_wallet.id, None, to_transaction.date, 'income', to_amount)
+    _commit(db, user_id)
     
     return {
         "from_wallet_balance": from_wallet.balance,
         "to_wallet_balance": to_wallet.balance,
+        "to_amount": to_amount,
         "from_transaction_id": from_transaction.id,
         "to_transaction_id": to_transaction.id
     }
\ No newline at end of file
@@ -1,21 +1,297 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 from dotenv import load_dotenv
+from fastapi import HTTPException, Request
+import itertools
 import os
+import sys
+import threading
+import time
 
 load_dotenv()
 
+# Both read their settings from the environment on import, so they come after load_dotenv
+import auth, user_cache
+
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL, echo=True)
+# "sync" (default) serves every route from the psycopg2 engine below;
+# "async" additionally mounts async_api routes on an asyncpg engine
+DB_MODE = os.getenv("DB_MODE", "sync")
+
+def _async_url(url):
+    if not url:
+        return url
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _async_url(DATABASE_URL)
+
+# Streaming replicas of DATABASE_URL that serve GET routes, comma-separated; unset sends everything to the primary
+REPLICA_DATABASE_URLS = [url.strip() for url in os.getenv("REPLICA_DATABASE_URLS", "").split(",") if url.strip()]
+REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", "2"))  # Seconds of replay lag before a replica is skipped
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv("REPLICA_LAG_CHECK_INTERVAL", "1"))
+# Seconds a user's reads stay on the primary after their last write; never shorter than the lag a usable replica
+# may have, which is REPLICA_MAX_LAG as of a reading up to three check intervals old (see Replica.usable)
+REPLICA_STICKY_SECONDS = max(
+    float(os.getenv("REPLICA_STICKY_SECONDS", "5")), REPLICA_MAX_LAG + 3 * REPLICA_LAG_CHECK_INTERVAL
+)
+
+# Engine tuning; pool sizes are per worker process
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))  # 0 disables the timeout
+# "false" (default), "true" to log statements, or "debug" to also log result rows
+DB_ECHO = os.getenv("DB_ECHO", "false").lower()
+
+def _echo_setting():
+    if DB_ECHO == "debug":
+        return "debug"
+    return DB_ECHO == "true"
+
+class PoolStats:
+    """Counters for time spent waiting to acquire a pooled connection."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.acquisitions = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float, timed_out: bool = False):
+        with self._lock:
+            self.acquisitions += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            if timed_out:
+                self.timeouts += 1
+
+class _TimedPoolMixin:
+    def connect(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.stats.record(time.perf_counter() - start, timed_out)
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    stats = PoolStats()
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    stats = PoolStats()
+
+def _replica_pool_class():
+    # Stats live on the pool class, so each replica engine gets a subclass of its own
+    return type("TimedReplicaQueuePool", (TimedQueuePool,), {"stats": PoolStats()})
+
+def _engine_options(pool_class, connect_args):
+    return {
+        "echo": _echo_setting(),
+        "poolclass": pool_class,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "connect_args": connect_args if DB_STATEMENT_TIMEOUT_MS else {},
+    }
+
+_SYNC_CONNECT_ARGS = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+
+engine = create_engine(DATABASE_URL, **_engine_options(TimedQueuePool, _SYNC_CONNECT_ARGS))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = None
+AsyncSessionLocal = None
+if DB_MODE == "async":
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        **_engine_options(TimedAsyncQueuePool, {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}})
+    )
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
+# Read replicas
+# Seconds the replica is behind the primary: 0 once it has replayed everything it received (an idle primary
+# sends nothing, so the age of the last replayed commit would overstate it), and 0 for a server that is not
+# a standby at all; NULL while a standby has not replayed anything yet
+_LAG_SQL = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0 "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+class Replica:
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.engine = create_engine(url, **_engine_options(_replica_pool_class(), _SYNC_CONNECT_ARGS))
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.lag = None  # Seconds, or None while unknown or unreachable
+        self.checked_at = 0.0
+        self.error = None
+
+    def check(self):
+        try:
+            with self.engine.connect() as conn:
+                lag = conn.execute(_LAG_SQL).scalar()
+            self.lag, self.error = (float(lag) if lag is not None else None), None
+        except exc.SQLAlchemyError as e:
+            self.lag, self.error = None, str(e).splitlines()[0]
+        self.checked_at = time.monotonic()
+
+    @property
+    def usable(self):
+        # A monitor that has stopped reporting is as bad as a lagging replica
+        fresh = time.monotonic() - self.checked_at <= 3 * REPLICA_LAG_CHECK_INTERVAL
+        return fresh and self.lag is not None and self.lag <= REPLICA_MAX_LAG
+
+class ReplicaSet:
+    """Replicas taken in turn, skipping any that lag; lag is measured by a background thread."""
+
+    def __init__(self, urls: list):
+        self.replicas = [Replica(f"replica{index}", url) for index, url in enumerate(urls)]
+        self._turn = itertools.count()
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.fallbacks = 0  # Reads sent to the primary because no replica was usable
+
+    def check_all(self):
+        for replica in self.replicas:
+            replica.check()
+
+    def _monitor(self):
+        while not self._stop.wait(REPLICA_LAG_CHECK_INTERVAL):
+            try:
+                self.check_all()
+            except Exception as e:
+                print(f"Replica lag check failed: {e}", file=sys.stderr)
+
+    def start(self):
+        # Started on first use, so importing this module never opens connections
+        with self._lock:
+            if self._thread is None and self.replicas:
+                self.check_all()
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._monitor, name="replica-lag-monitor", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            if self._thread is not None:
+                self._stop.set()
+                self._thread.join()
+                self._thread = None
+
+    def choose(self):
+        """A replica within REPLICA_MAX_LAG, or None to read from the primary."""
+        if not self.replicas:
+            return None
+        if self._thread is None:
+            self.start()
+        start = next(self._turn)
+        for offset in range(len(self.replicas)):
+            replica = self.replicas[(start + offset) % len(self.replicas)]
+            if replica.usable:
+                return replica
+        with self._lock:
+            self.fallbacks += 1
+        return None
+
+replicas = ReplicaSet(REPLICA_DATABASE_URLS)
+
+def read_session(user_id: int = None):
+    """A session for reads: a usable replica, unless the user wrote within REPLICA_STICKY_SECONDS."""
+    if replicas.replicas and user_id is not None:
+        if time.time() - user_cache.last_write(user_id) < REPLICA_STICKY_SECONDS:
+            return SessionLocal()
+    replica = replicas.choose()
+    return replica.SessionLocal() if replica is not None else SessionLocal()
+
 def get_db():
+    """Session on the primary; every route that writes uses this one."""
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+get_primary_db = get_db
+
+def get_replica_db(request: Request):
+    """Session for GET routes: on a replica, unless the caller wrote recently or no replica is usable."""
+    db = read_session(_request_user_id(request))
+    try:
+        yield db
+    finally:
+        db.close()
+
+def _request_user_id(request: Request):
+    # The {user_id} path parameter, else the bearer token's user; anonymous reads have no sticky window
+    user_id = request.path_params.get("user_id")
+    if user_id is not None:
+        try:
+            return int(user_id)
+        except ValueError:
+            return None
+    try:
+        principal = auth.get_principal(request)
+    except HTTPException:
+        return None
+    return principal.user_id if principal is not None else None
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def _pool_metrics(pool):
+    stats = pool.stats
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "acquisitions": stats.acquisitions,
+        "timeouts": stats.timeouts,
+        "avg_wait_ms": round(stats.total_wait / stats.acquisitions * 1000, 3) if stats.acquisitions else 0.0,
+        "max_wait_ms": round(stats.max_wait * 1000, 3),
+    }
+
+def get_pool_metrics():
+    metrics = {"sync": _pool_metrics(engine.pool)}
+    if async_engine is not None:
+        metrics["async"] = _pool_metrics(async_engine.sync_engine.pool)
+    for replica in replicas.replicas:
+        metrics[replica.name] = _pool_metrics(replica.engine.pool)
+    return metrics
+
+def get_replica_metrics():
+    return {
+        "max_lag_seconds": REPLICA_MAX_LAG,
+        "sticky_seconds": REPLICA_STICKY_SECONDS,
+        "fallbacks": replicas.fallbacks,
+        "replicas": [
+            {
+                "name": replica.name,
+                "lag_seconds": replica.lag,
+                "usable": replica.usable,
+                "checked_seconds_ago": round(time.monotonic() - replica.checked_at, 3) if replica.checked_at else None,
+                "error": replica.error,
+            }
+            for replica in replicas.replicas
+        ],
+    }
\ No newline at end of file
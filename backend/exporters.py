@@ -0,0 +1,68 @@
+# Streaming serializers for transaction export (CSV and NDJSON)
+#
+# Serializers consume row tuples from crud.stream_transactions and yield encoded chunks,
+# so a response is written out piecewise instead of being built in memory.
+
+import csv
+import io
+import json
+import zlib
+
+SUPPORTED_FORMATS = ("csv", "ndjson")
+
+EXPORT_COLUMNS = ("id", "date", "type", "amount", "description", "wallet_id", "category_id", "category_name")
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+# Rows are buffered into chunks of this many before being handed to the response
+CHUNK_ROWS = 500
+
+def _to_json_row(row):
+    return {
+        "id": row.id,
+        "date": row.date.isoformat(),
+        "type": row.type,
+        "amount": float(row.amount),
+        "description": row.description,
+        "wallet_id": row.wallet_id,
+        "category_id": row.category_id,
+        "category_name": row.category_name,
+    }
+
+def iter_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for index, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if index % CHUNK_ROWS == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+def iter_ndjson(rows):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(_to_json_row(row)))
+        if len(lines) == CHUNK_ROWS:
+            yield ("\n".join(lines) + "\n").encode()
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode()
+
+def gzip_stream(chunks):
+    compressor = zlib.compressobj(wbits=31)  # 31 = gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+SERIALIZERS = {
+    "csv": iter_csv,
+    "ndjson": iter_ndjson,
+}
@@ -0,0 +1,33 @@
+# JSON encoding for large list responses
+#
+# List endpoints that return thousands of rows skip the ORM and pydantic entirely: crud fetches plain
+# column tuples and shapes them into dicts matching the response schema, and this module encodes them.
+# orjson is used when installed, otherwise the stdlib encoder.
+
+import json
+from datetime import date
+from decimal import Decimal
+from fastapi import Response
+import instrumentation
+
+try:
+    import orjson
+except ImportError:  # Optional dependency, see requirements.txt
+    orjson = None
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(data) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data, default=_default)
+    return json.dumps(data, default=_default, separators=(",", ":")).encode()
+
+def response(data, headers: dict = None):
+    with instrumentation.timed_serialization():
+        content = dumps(data)
+    return Response(content=content, media_type="application/json", headers=headers)
@@ -0,0 +1,287 @@
+# Exchange rates and conversion of report totals into a user's home currency
+#
+# Each wallet holds money in its own currency (wallets.currency_id; NULL means its owner's home currency,
+# users.currency_id). fx_rates stores published rates per currency and day as units of the currency per one
+# FX_BASE_CURRENCY. Rates are loaded from local CSV files with a header row and date,currency,rate columns
+# (2025-01-31,EUR,0.9623): `python fx.py load <file or directory>...`.
+#
+# RateTable holds every rate in memory as one dense daily series per currency. Days between two published
+# rates are interpolated linearly; days before the first or after the last take the nearest published rate.
+# Reports never convert row by row in Python: daily_conversion() and monthly_conversion() turn the series for
+# a user's wallets into one array of factors that the report query indexes by wallet and date, so a converted
+# summary over millions of transactions is still a single aggregate query.
+
+import csv
+import os
+import sys
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal, InvalidOperation
+from fastapi import HTTPException
+from sqlalchemy import Float, Integer, Numeric, bindparam, cast, func
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import Grouping
+import models, user_cache
+
+FX_BASE_CURRENCY = os.getenv("FX_BASE_CURRENCY", "USD")
+FX_CACHE_TTL = int(os.getenv("FX_CACHE_TTL", "3600"))  # Seconds; fx.py load also refreshes its own process
+LOAD_BATCH_SIZE = 5000
+FACTOR_DIGITS = 10
+
+def _next_month(month: date):
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+class RateTable:
+    """Every loaded rate as a dense daily series per currency, with memoized monthly averages."""
+
+    def __init__(self, codes: dict, base_currency_id: int, published: dict):
+        # published maps currency_id -> [(day, rate), ...] in day order
+        self.codes = codes  # currency_id -> ISO code
+        self.base_currency_id = base_currency_id
+        self.loaded_at = time.monotonic()
+        self.first_day = min((points[0][0] for points in published.values()), default=None)
+        self.last_day = max((points[-1][0] for points in published.values()), default=None)
+        self._series = {currency_id: self._densify(points) for currency_id, points in published.items()}
+        self._monthly = {}
+
+    def _densify(self, points: list):
+        # One rate for every day from first_day to last_day
+        first_rate = float(points[0][1])
+        series = [first_rate] * ((points[0][0] - self.first_day).days + 1)
+        for (start, start_rate), (end, end_rate) in zip(points, points[1:]):
+            span = (end - start).days
+            start_rate, end_rate = float(start_rate), float(end_rate)
+            series.extend(start_rate + (end_rate - start_rate) * step / span for step in range(1, span + 1))
+        series.extend([float(points[-1][1])] * (self.last_day - points[-1][0]).days)
+        return series
+
+    def has(self, currency_id: int):
+        return currency_id == self.base_currency_id or currency_id in self._series
+
+    def rate(self, currency_id: int, day: date):
+        if currency_id == self.base_currency_id:
+            return 1.0
+        series = self._series[currency_id]
+        return series[min(max((day - self.first_day).days, 0), len(series) - 1)]
+
+    def factor(self, from_currency_id: int, to_currency_id: int, day: date):
+        """Multiplier converting an amount in from_currency_id into to_currency_id on day."""
+        return self.rate(to_currency_id, day) / self.rate(from_currency_id, day)
+
+    def monthly_factor(self, from_currency_id: int, to_currency_id: int, month: date):
+        # Mean of the month's daily factors, for amounts only known per month (monthly_rollups)
+        key = (from_currency_id, to_currency_id, month)
+        factor = self._monthly.get(key)
+        if factor is None:
+            days = (_next_month(month) - month).days
+            factor = sum(self.factor(from_currency_id, to_currency_id, month + timedelta(days=n)) for n in range(days)) / days
+            self._monthly[key] = factor
+        return factor
+
+def _load_table(db: Session):
+    codes = dict(db.query(models.Currency.id, models.Currency.code).all())
+    base_currency_id = next((currency_id for currency_id, code in codes.items() if code == FX_BASE_CURRENCY), None)
+    published = {}
+    for currency_id, day, rate in db.query(models.FxRate.currency_id, models.FxRate.day, models.FxRate.rate).order_by(
+        models.FxRate.currency_id, models.FxRate.day
+    ):
+        published.setdefault(currency_id, []).append((day, rate))
+    return RateTable(codes, base_currency_id, published)
+
+_table = None
+_lock = threading.Lock()
+
+def get_rates(db: Session) -> RateTable:
+    global _table
+    table = _table
+    if table is None or time.monotonic() - table.loaded_at > FX_CACHE_TTL:
+        with _lock:
+            if _table is None or time.monotonic() - _table.loaded_at > FX_CACHE_TTL:
+                _table = _load_table(db)
+            table = _table
+    return table
+
+def invalidate():
+    global _table
+    with _lock:
+        _table = None
+
+def _checked_rates(db: Session, currency_ids: list, target_currency_id: int):
+    table = get_rates(db)
+    if target_currency_id is None:
+        raise HTTPException(status_code=400, detail="Set a home currency to total wallets held in other currencies")
+    missing = [currency_id for currency_id in currency_ids + [target_currency_id] if not table.has(currency_id)]
+    if missing:
+        codes = ", ".join(table.codes.get(currency_id, str(currency_id)) for currency_id in missing)
+        raise HTTPException(status_code=400, detail=f"No exchange rates loaded for {codes}")
+    return table
+
+def _month_number(day):
+    return day.year * 12 + day.month - 1
+
+class Conversion:
+    """Per-wallet factors into one target currency, bound into a query as a single array parameter.
+
+    Every row looks its factor up by position, wallet and day, so the conversion adds no join and no sort
+    to the query it is used in. Wallets already in the target currency are not in the array and keep their
+    amounts as they are.
+    """
+
+    def __init__(self, wallet_ids: list, factors: list, first: date, last: date, monthly: bool):
+        self.wallet_ids = wallet_ids
+        self.factors = factors  # One run of len(days) factors per wallet, in wallet_ids order
+        self.first = first
+        self.last = last
+        self.monthly = monthly
+        self.days = (_month_number(last) - _month_number(first) if monthly else (last - first).days) + 1
+
+    def _offset(self, day):
+        # Days outside [first, last] are either filtered out by the query or fall where rates are flat,
+        # so they take the factor of the nearest day in the array
+        if self.monthly:
+            month = cast(func.extract("year", day) * 12 + func.extract("month", day) - 1, Integer)
+            return func.least(func.greatest(month, _month_number(self.first)), _month_number(self.last)) - _month_number(self.first)
+        return func.least(func.greatest(day, self.first), self.last) - self.first
+
+    def amount(self, amount, wallet_id, day):
+        wallet_ids = cast(bindparam(None, self.wallet_ids, type_=ARRAY(Integer)), ARRAY(Integer))
+        # Parenthesized so the cast can be subscripted
+        factors = Grouping(cast(bindparam(None, self.factors, type_=ARRAY(Float)), ARRAY(Float)))
+        position = func.array_position(wallet_ids, wallet_id)
+        return amount * func.coalesce(factors[(position - 1) * self.days + self._offset(day) + 1], 1)
+
+    def sum(self, expression):
+        # Factors are floats; totals are rounded back to cents
+        return func.round(cast(func.sum(expression), Numeric), 2)
+
+def _conversion(db: Session, wallet_currencies: dict, target_currency_id: int, start: date, end: date, monthly: bool):
+    wallet_currencies = {
+        wallet_id: currency_id for wallet_id, currency_id in wallet_currencies.items()
+        if currency_id is not None and currency_id != target_currency_id
+    }
+    if not wallet_currencies:
+        return None
+    table = _checked_rates(db, sorted(set(wallet_currencies.values())), target_currency_id)
+    if monthly:
+        # The months around the first and last published rates are partly interpolated; the ones beyond are flat
+        lowest = (table.first_day.replace(day=1) - timedelta(days=1)).replace(day=1)
+        highest = _next_month(table.last_day.replace(day=1))
+        start, end = start and start.replace(day=1), end and end.replace(day=1)
+    else:
+        lowest, highest = table.first_day, table.last_day
+    first = max(start, lowest) if start else lowest
+    last = min(end, highest) if end else highest
+    if first > last:
+        # The whole range lies before or after the published rates, where every day has the same factor
+        first = last = start if start and start > highest else end
+    days = []
+    day = first
+    while day <= last:
+        days.append(day)
+        day = _next_month(day) if monthly else day + timedelta(days=1)
+    wallet_ids, factors = sorted(wallet_currencies), []
+    for wallet_id in wallet_ids:
+        currency_id = wallet_currencies[wallet_id]
+        if monthly:
+            factors.extend(table.monthly_factor(currency_id, target_currency_id, day) for day in days)
+        else:
+            factors.extend(table.factor(currency_id, target_currency_id, day) for day in days)
+    return Conversion(wallet_ids, factors, first, last, monthly)
+
+def daily_conversion(db: Session, wallet_currencies: dict, target_currency_id: int, start: date = None, end: date = None):
+    """Conversion of dated rows into target_currency_id, or None if every wallet already is in it.
+
+    wallet_currencies maps wallet ids to their currency_id; NULL currencies are the target's already.
+    """
+    return _conversion(db, wallet_currencies, target_currency_id, start, end, monthly=False)
+
+def monthly_conversion(db: Session, wallet_currencies: dict, target_currency_id: int, start: date = None, end: date = None):
+    """Like daily_conversion(), for rows keyed by the first day of their month, at the month's average rate."""
+    return _conversion(db, wallet_currencies, target_currency_id, start, end, monthly=True)
+
+def convert(db: Session, amount: Decimal, from_currency_id: int, to_currency_id: int, day: date):
+    """A single amount in to_currency_id, rounded to cents; for wallet balances and transfers."""
+    if from_currency_id == to_currency_id:
+        return amount
+    table = _checked_rates(db, [from_currency_id], to_currency_id)
+    factor = Decimal(str(round(table.factor(from_currency_id, to_currency_id, day), FACTOR_DIGITS)))
+    return (amount * factor).quantize(Decimal("0.01"))
+
+# Loading
+def _rate_files(paths: list):
+    for path in paths:
+        if os.path.isdir(path):
+            yield from sorted(os.path.join(path, name) for name in os.listdir(path) if name.lower().endswith(".csv"))
+        else:
+            yield path
+
+def read_rates(path: str, currency_ids: dict):
+    """{(currency_id, day): rate} from one file, and the currency codes it has that are not in currencies."""
+    rates, unknown = {}, set()
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for line, record in enumerate(csv.DictReader(f), start=2):
+            try:
+                code = record["currency"].strip().upper()
+                day = date.fromisoformat(record["date"].strip())
+                rate = Decimal(record["rate"].strip())
+            except (AttributeError, KeyError, ValueError, InvalidOperation):
+                raise ValueError(f"{path}:{line}: expected date,currency,rate columns, got {record}")
+            if rate <= 0:
+                raise ValueError(f"{path}:{line}: rate must be positive")
+            if code not in currency_ids:
+                unknown.add(code)
+                continue
+            rates[(currency_ids[code], day)] = rate
+    return rates, unknown
+
+def load_files(db: Session, paths: list):
+    """Upsert every rate in paths (files or directories of .csv files); returns (rates loaded, unknown codes)."""
+    currency_ids = {code: currency_id for currency_id, code in db.query(models.Currency.id, models.Currency.code)}
+    rates, unknown = {}, set()
+    for path in _rate_files(paths):
+        file_rates, file_unknown = read_rates(path, currency_ids)
+        rates.update(file_rates)  # Later files win for the same day
+        unknown |= file_unknown
+    rows = [{"currency_id": currency_id, "day": day, "rate": rate} for (currency_id, day), rate in sorted(rates.items())]
+    for offset in range(0, len(rows), LOAD_BATCH_SIZE):
+        stmt = pg_insert(models.FxRate).values(rows[offset:offset + LOAD_BATCH_SIZE])
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[models.FxRate.currency_id, models.FxRate.day], set_={"rate": stmt.excluded.rate}
+        ))
+    db.commit()
+    invalidate()
+    user_cache.clear()
+    return len(rows), sorted(unknown)
+
+if __name__ == "__main__":
+    from database import SessionLocal
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    db = SessionLocal()
+    try:
+        if command == "load" and len(sys.argv) > 2:
+            try:
+                loaded, unknown = load_files(db, sys.argv[2:])
+            except (OSError, ValueError) as error:
+                sys.exit(str(error))
+            print(f"Loaded {loaded} rates.")
+            if unknown:
+                print(f"Skipped currencies missing from the currencies table: {', '.join(unknown)}")
+        elif command == "list":
+            for code, first, last, count in db.query(
+                models.Currency.code, func.min(models.FxRate.day), func.max(models.FxRate.day), func.count()
+            ).join(models.FxRate, models.FxRate.currency_id == models.Currency.id).group_by(models.Currency.code).order_by(models.Currency.code):
+                print(f"{code}: {count} rates from {first} to {last}")
+        elif command == "rate" and len(sys.argv) > 3:
+            table = get_rates(db)
+            ids = {code: currency_id for currency_id, code in table.codes.items()}
+            day = date.fromisoformat(sys.argv[4]) if len(sys.argv) > 4 else date.today()
+            from_code, to_code = sys.argv[2].upper(), sys.argv[3].upper()
+            if any(ids.get(code) is None or not table.has(ids[code]) for code in (from_code, to_code)):
+                sys.exit(f"No rates for {from_code} or {to_code}.")
+            print(f"1 {from_code} = {table.factor(ids[from_code], ids[to_code], day):.6f} {to_code} on {day}")
+        else:
+            sys.exit("Usage: python fx.py load <file or directory>... | list | rate <from> <to> [YYYY-MM-DD]")
+    finally:
+        db.close()
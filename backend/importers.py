@@ -0,0 +1,106 @@
+# Streaming parsers for bulk transaction import (CSV, QIF and OFX)
+#
+# Each parser reads a text stream line by line and yields (row_number, fields) pairs,
+# so an upload is never held in memory as a whole. Fields are raw strings; validation
+# happens in crud.import_transactions.
+
+import csv
+import re
+from datetime import date, datetime
+
+SUPPORTED_FORMATS = ("csv", "qif", "ofx")
+
+QIF_DATE_FORMATS = ("%m/%d/%Y", "%m/%d/%y", "%d/%m/%Y", "%Y-%m-%d", "%m-%d-%Y")
+
+OFX_TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<\r\n]*)")
+
+def detect_format(filename: str = None, format: str = None):
+    if format:
+        return format.lower()
+    if filename and "." in filename:
+        extension = filename.rsplit(".", 1)[1].lower()
+        if extension in SUPPORTED_FORMATS:
+            return extension
+    return "csv"
+
+def parse_date(value: str):
+    value = value.strip()
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        pass
+    # QIF exports often write the year as MM/DD'YY
+    value = value.replace("'", "/").replace(" ", "")
+    for fmt in QIF_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognized date '{value}'")
+
+def parse_csv(stream):
+    reader = csv.DictReader(stream)
+    if reader.fieldnames:
+        reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+    for row in reader:
+        # Header is line 1, so data rows start at line 2
+        yield reader.line_num, row
+
+def parse_qif(stream):
+    record = {}
+    start_line = None
+    for line_number, line in enumerate(stream, start=1):
+        line = line.rstrip("\r\n")
+        if not line or line.startswith("!"):
+            continue
+        if start_line is None:
+            start_line = line_number
+        code, value = line[0], line[1:].strip()
+        if code == "^":
+            if record:
+                yield start_line, record
+            record = {}
+            start_line = None
+        elif code == "D":
+            record["date"] = value
+        elif code == "T" or code == "U":
+            record["amount"] = value.replace(",", "")
+        elif code == "P":
+            record["description"] = value
+        elif code == "M" and "description" not in record:
+            record["description"] = value
+        elif code == "L":
+            record["category"] = value
+    if record:
+        yield start_line, record
+
+def parse_ofx(stream):
+    record = None
+    start_line = None
+    for line_number, line in enumerate(stream, start=1):
+        for closing, tag, value in OFX_TAG.findall(line):
+            tag = tag.upper()
+            value = value.strip()
+            if tag == "STMTTRN":
+                if closing:
+                    if record:
+                        yield start_line, record
+                    record = None
+                else:
+                    record = {}
+                    start_line = line_number
+            elif record is not None and not closing and value:
+                if tag == "DTPOSTED":
+                    record["date"] = f"{value[0:4]}-{value[4:6]}-{value[6:8]}"
+                elif tag == "TRNAMT":
+                    record["amount"] = value
+                elif tag == "NAME":
+                    record["description"] = value
+                elif tag == "MEMO" and "description" not in record:
+                    record["description"] = value
+
+PARSERS = {
+    "csv": parse_csv,
+    "qif": parse_qif,
+    "ofx": parse_ofx,
+}
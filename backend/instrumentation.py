@@ -0,0 +1,246 @@
+# Per-request performance instrumentation
+#
+# RequestMetricsMiddleware times every request against its route template ("/api/users/{user_id}/wallets/",
+# not the concrete path) and, through SQLAlchemy engine events, counts the queries it ran and the time they
+# took. Each response gets a Server-Timing header splitting the request into db, serialize and app time,
+# which browser dev tools show next to the request. Totals are kept as Prometheus histograms and served in
+# the text exposition format by render_metrics() (GET /metrics). Statements slower than SLOW_QUERY_MS are
+# logged to the "mintro.slow_queries" logger with their parameters, sampled at SLOW_QUERY_SAMPLE_RATE.
+
+import logging
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+
+INSTRUMENTATION = os.getenv("INSTRUMENTATION", "true").lower() == "true"
+SERVER_TIMING = os.getenv("SERVER_TIMING", "true").lower() == "true"
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_SAMPLE_RATE = float(os.getenv("SLOW_QUERY_SAMPLE_RATE", "1.0"))  # Share of slow queries logged
+SLOW_QUERY_MAX_PARAMS = 500  # Characters of the parameter repr kept in the log
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+slow_query_log = logging.getLogger("mintro.slow_queries")
+
+class Histogram:
+    """Prometheus histogram keyed by a tuple of label values."""
+
+    def __init__(self, name: str, help: str, label_names: tuple, buckets: tuple):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+
+    def observe(self, labels: tuple, value: float):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            index = bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(labels, list(values)) for labels, values in self._series.items()]
+        for labels, values in sorted(series):
+            label_text = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels))
+            prefix = label_text + "," if label_text else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {values[-1]}')
+            suffix = f"{{{label_text}}}" if label_text else ""
+            lines.append(f"{self.name}_sum{suffix} {values[-2]}")
+            lines.append(f"{self.name}_count{suffix} {values[-1]}")
+        return lines
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+request_duration = Histogram(
+    "http_request_duration_seconds", "Request latency until the response starts, by route template.",
+    ("method", "route", "status"), LATENCY_BUCKETS
+)
+request_db_duration = Histogram(
+    "http_request_db_duration_seconds", "Time spent executing SQL per request.", ("method", "route"), LATENCY_BUCKETS
+)
+request_queries = Histogram(
+    "http_request_queries", "SQL statements executed per request.", ("method", "route"), QUERY_COUNT_BUCKETS
+)
+query_duration = Histogram(
+    "db_query_duration_seconds", "Duration of every SQL statement, including those outside requests.", (), LATENCY_BUCKETS
+)
+
+class SlowQueryStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.slow = 0
+        self.logged = 0
+
+    def record(self, logged: bool):
+        with self.lock:
+            self.slow += 1
+            self.logged += logged
+
+slow_queries = SlowQueryStats()
+
+class RequestStats:
+    """Work attributed to the current request; shared with the threadpool and greenlets it runs on."""
+    __slots__ = ("scope", "queries", "db_time", "serialize_time")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+
+    @property
+    def route(self):
+        # Set by FastAPI's router once the request is matched; unmatched paths share one label to bound cardinality
+        route = self.scope.get("route")
+        if route is None:
+            return "unmatched"
+        # Routes from an included router may report their path without the include prefix ("/api");
+        # recover it by rendering the template with this request's parameters and comparing to the real path
+        path = self.scope["path"]
+        try:
+            concrete = route.path_format.format(**self.scope.get("path_params", {}))
+        except (AttributeError, KeyError, IndexError):
+            return route.path
+        if path.endswith(concrete):
+            return path[:len(path) - len(concrete)] + route.path
+        return route.path
+
+_current = ContextVar("request_stats", default=None)
+
+@contextmanager
+def timed_serialization():
+    # Wraps the response encoders we own (user_cache.serialize, fast_json.response); FastAPI's own
+    # response_model encoding is not separated and counts as app time
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats = _current.get()
+        if stats is not None:
+            stats.serialize_time += time.perf_counter() - start
+
+# Engine events
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    query_duration.observe((), elapsed)
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        logged = random.random() < SLOW_QUERY_SAMPLE_RATE
+        slow_queries.record(logged)
+        if logged:
+            params = repr(parameters)
+            if len(params) > SLOW_QUERY_MAX_PARAMS:
+                params = params[:SLOW_QUERY_MAX_PARAMS] + "..."
+            slow_query_log.warning(
+                "slow query %.1f ms route=%s statement=%s parameters=%s",
+                elapsed * 1000, stats.route if stats is not None else None, " ".join(statement.split()), params
+            )
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute; drop its start time
+    starts = exception_context.connection.info.get("query_start") if exception_context.connection is not None else None
+    if starts:
+        starts.pop()
+
+def instrument_engine(engine):
+    """Attach the query counters to a sync Engine (pass async_engine.sync_engine for the async one)."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+# Middleware
+class RequestMetricsMiddleware:
+    """Pure ASGI middleware, so streaming responses and background tasks pass through untouched."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats(scope)
+        token = _current.set(stats)
+        start = time.perf_counter()
+        response = {"status": 500, "latency": None}
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                total = time.perf_counter() - start
+                response.update(status=message["status"], latency=total)
+                if SERVER_TIMING:
+                    app_time = max(total - stats.db_time - stats.serialize_time, 0.0)
+                    header = (
+                        f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries", '
+                        f"serialize;dur={stats.serialize_time * 1000:.1f}, app;dur={app_time * 1000:.1f}, "
+                        f"total;dur={total * 1000:.1f}"
+                    )
+                    message["headers"] = list(message.get("headers", [])) + [(b"server-timing", header.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            # Streaming bodies (exports) are timed to their first byte, like the Server-Timing header
+            latency = response["latency"] if response["latency"] is not None else time.perf_counter() - start
+            route, method = stats.route, scope["method"]
+            request_duration.observe((method, route, str(response["status"])), latency)
+            request_db_duration.observe((method, route), stats.db_time)
+            request_queries.observe((method, route), stats.queries)
+
+def _gauge(name: str, help: str, values: dict, type: str = "gauge"):
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {type}"]
+    for labels, value in values.items():
+        label_text = ",".join(f'{key}="{_escape(label)}"' for key, label in labels)
+        lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+    return lines
+
+def render_metrics(pool_metrics: dict, cache_metrics: dict, replica_metrics: dict = None):
+    """Every metric in the Prometheus text exposition format."""
+    lines = []
+    for histogram in (request_duration, request_db_duration, request_queries, query_duration):
+        lines += histogram.render()
+    lines += _gauge("db_slow_queries_total", f"Statements slower than {SLOW_QUERY_MS:g} ms.", {(): slow_queries.slow}, "counter")
+    for field in ("checked_out", "overflow", "timeouts"):
+        lines += _gauge(f"db_pool_{field}", f"Connection pool {field.replace('_', ' ')}.",
+                        {(("engine", name),): pool[field] for name, pool in pool_metrics.items()})
+    for field in ("hits", "misses", "invalidations", "errors"):
+        lines += _gauge(f"user_cache_{field}_total", f"Response cache {field}.", {(): cache_metrics[field]}, "counter")
+    if replica_metrics and replica_metrics["replicas"]:
+        # An unreachable replica is reported as NaN lag
+        lines += _gauge("db_replica_lag_seconds", "Replay lag of each read replica.", {
+            (("replica", replica["name"]),): replica["lag_seconds"] if replica["lag_seconds"] is not None else "NaN"
+            for replica in replica_metrics["replicas"]
+        })
+        lines += _gauge("db_replica_usable", "1 while a replica is within the lag limit.", {
+            (("replica", replica["name"]),): int(replica["usable"]) for replica in replica_metrics["replicas"]
+        })
+        lines += _gauge("db_replica_fallbacks_total", "Reads sent to the primary because no replica was usable.",
+                        {(): replica_metrics["fallbacks"]}, "counter")
+    return "\n".join(lines) + "\n"
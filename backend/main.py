@@ -1,12 +1,37 @@
 # FastAPI Backend for Mintro
 
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from api import router as api_router
-from database import engine
+from database import engine, async_engine, replicas, SessionLocal, DB_MODE, get_pool_metrics, get_replica_metrics
 from models import Base
+import reference_cache
+import password_hashing
+import auth
+import scheduler
+import partitions
+import user_cache
+import instrumentation
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm the reference data cache so the first page load doesn't pay for it
+    reference_cache.load_all()
+    # Partitions for this month and the next few, so new transactions skip the default partition
+    with SessionLocal() as db:
+        partitions.ensure_partitions(db)
+    if scheduler.RECURRING_SCHEDULER:
+        scheduler.start()
+    # Measure replica lag before the first read is routed
+    replicas.start()
+    yield
+    scheduler.stop()
+    replicas.stop()
+    password_hashing.shutdown()
+
+app = FastAPI(lifespan=lifespan)
 
 # Enable CORS
 app.add_middleware(
@@ -15,8 +40,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Server-Timing"],
 )
 
+# Per-route latency, SQL counts and Server-Timing; added last so it also times the CORS middleware
+if instrumentation.INSTRUMENTATION:
+    instrumentation.instrument_engine(engine)
+    if async_engine is not None:
+        instrumentation.instrument_engine(async_engine.sync_engine)
+    for replica in replicas.replicas:
+        instrumentation.instrument_engine(replica.engine)
+    app.add_middleware(instrumentation.RequestMetricsMiddleware)
+
 # Create tables
 Base.metadata.create_all(bind=engine)
 
@@ -24,4 +59,29 @@ Base.metadata.create_all(bind=engine)
 def read_root():
     return {"message": "Welcome to Mintro Backend"}
 
-app.include_router(api_router, prefix="/api")
\ No newline at end of file
+@app.get("/metrics/pool")
+def read_pool_metrics():
+    return get_pool_metrics()
+
+@app.get("/metrics/replicas")
+def read_replica_metrics():
+    return get_replica_metrics()
+
+@app.get("/metrics/cache")
+def read_cache_metrics():
+    return user_cache.get_cache_metrics()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def read_metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(
+        instrumentation.render_metrics(get_pool_metrics(), user_cache.get_cache_metrics(), get_replica_metrics()),
+        media_type="text/plain; version=0.0.4"
+    )
+
+if DB_MODE == "async":
+    # Registered first so these async handlers take precedence over their sync counterparts
+    from async_api import router as async_api_router
+    app.include_router(async_api_router, prefix="/api", dependencies=[Depends(auth.authorize_request)])
+
+app.include_router(api_router, prefix="/api", dependencies=[Depends(auth.authorize_request)])
\ No newline at end of file
@@ -1,14 +1,13 @@
-from sqlalchemy import Column, Integer, String, CheckConstraint, Date, ForeignKey, DECIMAL, TIMESTAMP
+from sqlalchemy import Column, Integer, String, Boolean, CheckConstraint, Computed, DDL, Date, ForeignKey, DECIMAL, TIMESTAMP, Index, event
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
-from passlib.context import CryptContext
+from sqlalchemy.orm import relationship, deferred, column_property
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.sql import func, text, select, case, and_
+import password_hashing
 
 Base = declarative_base()
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
-
 class Currency(Base):
     __tablename__ = "currencies"
     id = Column(Integer, primary_key=True, index=True)
@@ -19,6 +18,13 @@ class Currency(Base):
     countries = relationship("Country", back_populates="currency")
     users = relationship("User", back_populates="currency")
 
+class FxRate(Base):
+    __tablename__ = "fx_rates"
+    # Published exchange rates, loaded from files by fx.py; units of the currency per one fx.FX_BASE_CURRENCY
+    currency_id = Column(Integer, ForeignKey("currencies.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    rate = Column(DECIMAL(18, 8), nullable=False)
+
 class Country(Base):
     __tablename__ = "countries"
     id = Column(Integer, primary_key=True, index=True)
@@ -73,10 +79,14 @@ class User(Base):
     savings_goals = relationship("SavingsGoal", back_populates="owner")
     
     def set_password(self, password: str):
-        self.password_hash = pwd_context.hash(password)
+        self.password_hash = password_hashing.hash_password(password)
     
     def verify_password(self, password: str) -> bool:
-        return pwd_context.verify(password, self.password_hash)
+        valid, new_hash = password_hashing.verify_and_update(password, self.password_hash)
+        if valid and new_hash:
+            # Stored hash used outdated argon2 parameters; caller commits the upgraded one
+            self.password_hash = new_hash
+        return valid
 
 class Wallet(Base):
     __tablename__ = "wallets"
@@ -86,6 +96,7 @@ class Wallet(Base):
     balance = Column(DECIMAL(15, 2), default=0.00)
     color = Column(String(7), default="#000000")
     owner_id = Column(Integer, ForeignKey("users.id"))
+    currency_id = Column(Integer, ForeignKey("currencies.id"))  # NULL holds the owner's home currency
     created_at = Column(TIMESTAMP, default=func.now())
     updated_at = Column(TIMESTAMP, default=func.now(), onupdate=func.now())
     
@@ -95,15 +106,19 @@ class Wallet(Base):
 
 class Transaction(Base):
     __tablename__ = "transactions"
-    id = Column(Integer, primary_key=True, index=True)
+    # Range-partitioned by month on date (see partitions.py), so the table's primary key must include date;
+    # ids still come from one sequence and identify a row on their own
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     category_id = Column(Integer, ForeignKey("transaction_categories.id"))
     amount = Column(DECIMAL(15, 2), nullable=False)
-    date = Column(Date, nullable=False)
+    date = Column(Date, primary_key=True, nullable=False)
     type = Column(String(10), nullable=False)  # 'income' or 'expense'
     description = Column(String)
     wallet_id = Column(Integer, ForeignKey("wallets.id"))
     owner_id = Column(Integer, ForeignKey("users.id"))
     created_at = Column(TIMESTAMP, default=func.now())
+    # Maintained by PostgreSQL for description search; deferred so regular reads don't fetch it
+    description_tsv = deferred(Column(TSVECTOR, Computed("to_tsvector('simple', coalesce(description, ''))", persisted=True)))
     
     category = relationship("TransactionCategory", back_populates="transactions")
     wallet = relationship("Wallet", back_populates="transactions")
@@ -111,7 +126,17 @@ class Transaction(Base):
     
     __table_args__ = (
         CheckConstraint("type IN ('income', 'expense')", name="transactions_type_check"),
+        Index("idx_transactions_owner_date_id", "owner_id", "date", "id"),
+        Index("idx_transactions_description_tsv", "description_tsv", postgresql_using="gin"),
+        {"postgresql_partition_by": "RANGE (date)"},
     )
+    __mapper_args__ = {"primary_key": [id]}
+
+# Rows for months without a partition land here until partitions.ensure_partitions() moves them out
+event.listen(
+    Transaction.__table__, "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS transactions_default PARTITION OF transactions DEFAULT")
+)
 
 class SavingsGoal(Base):
     __tablename__ = "savings_goals"
@@ -119,17 +144,112 @@ class SavingsGoal(Base):
     name = Column(String(100), nullable=False)
     description = Column(String)
     goal_amount = Column(DECIMAL(15, 2), nullable=False)
-    current_amount = Column(DECIMAL(15, 2), default=0.00)
+    stored_amount = Column("current_amount", DECIMAL(15, 2), default=0.00)  # Progress of individual goals
     target_date = Column(Date)
     savings_type = Column(String(20), nullable=False, default="individual")  # 'individual' or 'linked'
     linked_wallet_id = Column(Integer, ForeignKey("wallets.id"), nullable=True)
     owner_id = Column(Integer, ForeignKey("users.id"))
     created_at = Column(TIMESTAMP, default=func.now())
     updated_at = Column(TIMESTAMP, default=func.now(), onupdate=func.now())
+    # Balance of the linked wallet, read in the same SELECT as the goal so it is always current
+    linked_balance = column_property(
+        select(Wallet.balance).where(Wallet.id == linked_wallet_id, Wallet.owner_id == owner_id).scalar_subquery()
+    )
     
     owner = relationship("User", back_populates="savings_goals")
     linked_wallet = relationship("Wallet")
     
+    @hybrid_property
+    def current_amount(self):
+        # Linked goals track their wallet's balance; individual goals (or a deleted wallet) use the stored amount
+        if self.savings_type == "linked" and self.linked_balance is not None:
+            return self.linked_balance
+        return self.stored_amount
+    
+    @current_amount.inplace.setter
+    def _current_amount_setter(self, value):
+        self.stored_amount = value
+    
+    @current_amount.inplace.expression
+    @classmethod
+    def _current_amount_expression(cls):
+        return case(
+            (and_(cls.savings_type == "linked", cls.linked_balance.is_not(None)), cls.linked_balance),
+            else_=cls.stored_amount
+        )
+    
     __table_args__ = (
         CheckConstraint("savings_type IN ('individual', 'linked')", name="savings_goals_savings_type_check"),
+    )
+
+class MonthlyRollup(Base):
+    __tablename__ = "monthly_rollups"
+    id = Column(Integer, primary_key=True, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    wallet_id = Column(Integer, ForeignKey("wallets.id", ondelete="CASCADE"))
+    category_id = Column(Integer, ForeignKey("transaction_categories.id", ondelete="SET NULL"))
+    month = Column(Date, nullable=False)  # First day of the month
+    type = Column(String(10), nullable=False)  # 'income' or 'expense'
+    total = Column(DECIMAL(15, 2), nullable=False, default=0.00)
+    count = Column(Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        CheckConstraint("type IN ('income', 'expense')", name="monthly_rollups_type_check"),
+        Index("idx_monthly_rollups_owner_month", "owner_id", "month"),
+    )
+
+# Upsert key for monthly_rollups; wallet and category may be NULL so they are coalesced
+MONTHLY_ROLLUP_KEY = [
+    MonthlyRollup.owner_id,
+    func.coalesce(MonthlyRollup.wallet_id, 0),
+    func.coalesce(MonthlyRollup.category_id, 0),
+    MonthlyRollup.month,
+    MonthlyRollup.type,
+]
+Index("uq_monthly_rollups_key", *MONTHLY_ROLLUP_KEY, unique=True)
+
+class WalletDailyBalance(Base):
+    __tablename__ = "wallet_daily_balances"
+    # Net balance change per wallet per day; the closing balance on a day is the wallet's current
+    # balance minus the changes dated after it
+    wallet_id = Column(Integer, ForeignKey("wallets.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    net_change = Column(DECIMAL(15, 2), nullable=False, default=0.00)
+
+class TransactionArchive(Base):
+    __tablename__ = "transaction_archives"
+    # One row per transactions partition exported to cold storage by partitions.archive_partitions()
+    id = Column(Integer, primary_key=True, index=True)
+    partition_name = Column(String(63), nullable=False)
+    range_start = Column(Date, nullable=False)  # Inclusive
+    range_end = Column(Date, nullable=False)  # Exclusive
+    row_count = Column(Integer, nullable=False)
+    path = Column(String, nullable=False)  # gzip-compressed CSV with a header row
+    archived_at = Column(TIMESTAMP, default=func.now())
+
+class RecurringTransaction(Base):
+    __tablename__ = "recurring_transactions"
+    id = Column(Integer, primary_key=True, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    wallet_id = Column(Integer, ForeignKey("wallets.id", ondelete="CASCADE"), nullable=False)
+    category_id = Column(Integer, ForeignKey("transaction_categories.id", ondelete="SET NULL"))
+    amount = Column(DECIMAL(15, 2), nullable=False)
+    type = Column(String(10), nullable=False)  # 'income' or 'expense'
+    description = Column(String)
+    rrule = Column(String(255), nullable=False)  # e.g. 'FREQ=MONTHLY;INTERVAL=1'
+    start_date = Column(Date, nullable=False)
+    next_run_at = Column(Date)  # Date of the next occurrence to post; NULL once the schedule has ended
+    occurrence_index = Column(Integer, nullable=False, default=0)  # Index of next_run_at within the rule
+    active = Column(Boolean, nullable=False, default=True)
+    last_run_at = Column(TIMESTAMP)
+    last_error = Column(String)
+    created_at = Column(TIMESTAMP, default=func.now())
+    
+    category = relationship("TransactionCategory")
+    
+    __table_args__ = (
+        CheckConstraint("type IN ('income', 'expense')", name="recurring_transactions_type_check"),
+        # The scheduler only ever looks at active schedules ordered by next_run_at
+        Index("idx_recurring_transactions_due", "next_run_at", "id", postgresql_where=text("active")),
+        Index("idx_recurring_transactions_owner_id", "owner_id"),
     )
\ No newline at end of file
@@ -0,0 +1,232 @@
+# Monthly range partitions of the transactions table, and archival of cold history
+#
+# transactions is PARTITION BY RANGE (date) with one partition per month (transactions_y2024m01, ...) and a
+# DEFAULT partition that takes rows for months without their own, so writes never fail on a missing
+# partition. ensure_partitions() creates the months ahead of today and moves rows out of the default
+# partition into partitions for their month. Queries filtered by date only touch the partitions in range,
+# and each month's indexes stay the size of one month of data.
+#
+# archive_partitions() exports whole months older than the archive horizon to gzip-compressed CSV files in
+# ARCHIVE_DIR and drops them. monthly_rollups and wallet_daily_balances are kept, so analytics over whole
+# months, balance history and dashboards still cover archived history; listings and search do not.
+# restore_archive() loads an archive back.
+#
+# Run from cron or by hand with `python partitions.py [ensure|archive|list|restore <archive_id>|migrate]`.
+# The API also runs ensure_partitions() at startup, and the scheduler loop runs maintain() on every pass.
+
+import gzip
+import logging
+import os
+import re
+import sys
+from datetime import date, datetime
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+import models, user_cache
+
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))  # Future months created in advance
+ARCHIVE_AFTER_MONTHS = int(os.getenv("ARCHIVE_AFTER_MONTHS", "0"))  # Months kept online; 0 disables archival
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+
+DEFAULT_PARTITION = "transactions_default"
+# Serializes partition maintenance across API processes, schedulers and cron runs
+_MAINTENANCE_LOCK = 7_301_001
+# Every stored column; description_tsv is generated and cannot be copied in
+COLUMNS = ("id", "category_id", "amount", "date", "type", "description", "wallet_id", "owner_id", "created_at")
+_BOUND = re.compile(r"FROM \('(\d{4}-\d{2}-\d{2})'\) TO \('(\d{4}-\d{2}-\d{2})'\)")
+
+log = logging.getLogger("mintro.partitions")
+
+def month_start(day: date):
+    return day.replace(day=1)
+
+def add_months(month: date, months: int):
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(month: date):
+    return f"transactions_y{month.year}m{month.month:02d}"
+
+def is_partitioned(db: Session):
+    return db.execute(text("SELECT relkind FROM pg_class WHERE oid = 'transactions'::regclass")).scalar() == "p"
+
+def _lock(db: Session):
+    db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _MAINTENANCE_LOCK})
+
+def list_partitions(db: Session):
+    """(name, range_start, range_end) of every monthly partition, oldest first; the default partition is left out."""
+    rows = db.execute(text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = 'transactions'::regclass"
+    )).all()
+    partitions = []
+    for name, bound in rows:
+        match = _BOUND.search(bound)
+        if match:
+            partitions.append((name, date.fromisoformat(match.group(1)), date.fromisoformat(match.group(2))))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+def _create_partition(db: Session, month: date):
+    # Rows already in the default partition for this month have to leave it before the partition can exist;
+    # they are moved in the same transaction, so readers see them throughout
+    start, end = month_start(month), add_months(month_start(month), 1)
+    name = partition_name(start)
+    bounds = {"start": start, "end": end}
+    columns = ", ".join(COLUMNS)
+    moved = db.execute(text(
+        f"CREATE TEMP TABLE moved_transactions ON COMMIT DROP AS WITH moved AS ("
+        f"DELETE FROM {DEFAULT_PARTITION} WHERE date >= :start AND date < :end RETURNING {columns}"
+        f") SELECT * FROM moved"
+    ), bounds).rowcount
+    db.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF transactions "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    ))
+    if moved:
+        db.execute(text(f"INSERT INTO transactions ({columns}) SELECT {columns} FROM moved_transactions"))
+    db.execute(text("DROP TABLE moved_transactions"))
+    return name, moved
+
+def ensure_partitions(db: Session, today: date = None):
+    """Create partitions for the coming months and for every month with rows in the default partition."""
+    if not is_partitioned(db):
+        # Databases created before partitioning keep working on the plain table until they are migrated
+        db.rollback()
+        log.warning("transactions is not partitioned; run `python partitions.py migrate` to partition it")
+        return []
+    today = today or date.today()
+    months = {add_months(month_start(today), offset) for offset in range(PARTITION_MONTHS_AHEAD + 1)}
+    months -= {partition[1] for partition in list_partitions(db)}
+    # Months with their own partition never have rows in the default one
+    months.update(db.execute(text(
+        f"SELECT DISTINCT CAST(date_trunc('month', date) AS date) FROM {DEFAULT_PARTITION}"
+    )).scalars())
+    db.commit()
+    created = []
+    # One short transaction per month keeps the locks on transactions brief
+    for month in sorted(months):
+        _lock(db)
+        created.append(_create_partition(db, month))
+        db.commit()
+    return created
+
+def archived_until(db: Session):
+    """End of the newest archived month, or None; summaries before it can no longer be rebuilt from transactions."""
+    return db.query(models.TransactionArchive.range_end).order_by(models.TransactionArchive.range_end.desc()).limit(1).scalar()
+
+def _archive_path(name: str):
+    return os.path.join(ARCHIVE_DIR, f"{name}-{datetime.now().strftime('%Y%m%d%H%M%S')}.csv.gz")
+
+def archive_partitions(db: Session, before: date):
+    """Export every monthly partition that ends on or before `before` to ARCHIVE_DIR, then drop it."""
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    archived = []
+    for name, start, end in list_partitions(db):
+        if end > before:
+            break
+        _lock(db)
+        if db.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is None:
+            db.rollback()  # Archived by a concurrent run while we waited for the lock
+            continue
+        path = _archive_path(name)
+        cursor = db.connection().connection.dbapi_connection.cursor()
+        try:
+            # The file is complete before the partition is dropped; a failure leaves the data online
+            with gzip.open(path, "wb") as archive:
+                cursor.copy_expert(
+                    f"COPY (SELECT {', '.join(COLUMNS)} FROM {name} ORDER BY id) TO STDOUT WITH (FORMAT csv, HEADER)", archive
+                )
+            row_count = cursor.rowcount
+        finally:
+            cursor.close()
+        db.add(models.TransactionArchive(
+            partition_name=name, range_start=start, range_end=end, row_count=row_count, path=path
+        ))
+        db.execute(text(f"DROP TABLE {name}"))
+        db.commit()
+        archived.append((name, row_count, path))
+    if archived:
+        user_cache.clear()
+    return archived
+
+def restore_archive(db: Session, archive_id: int):
+    """Load an archived month back into transactions; returns the number of rows restored, or None if unknown."""
+    archive = db.get(models.TransactionArchive, archive_id)
+    if archive is None:
+        return None
+    _lock(db)
+    _create_partition(db, archive.range_start)
+    cursor = db.connection().connection.dbapi_connection.cursor()
+    try:
+        with gzip.open(archive.path, "rb") as source:
+            cursor.copy_expert(f"COPY transactions ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv, HEADER)", source)
+        row_count = cursor.rowcount
+    finally:
+        cursor.close()
+    db.delete(archive)
+    db.commit()
+    user_cache.clear()
+    return row_count
+
+def maintain(db: Session, today: date = None):
+    today = today or date.today()
+    result = {"created": ensure_partitions(db, today), "archived": []}
+    if ARCHIVE_AFTER_MONTHS > 0:
+        result["archived"] = archive_partitions(db, add_months(month_start(today), -ARCHIVE_AFTER_MONTHS))
+    return result
+
+def migrate(db: Session):
+    """Convert an unpartitioned transactions table (created before partitioning) in one transaction."""
+    if is_partitioned(db):
+        return False
+    _lock(db)
+    db.execute(text("ALTER TABLE transactions RENAME TO transactions_unpartitioned"))
+    db.execute(text("ALTER SEQUENCE transactions_id_seq RENAME TO transactions_unpartitioned_id_seq"))
+    # Free the index and constraint names for the partitioned table
+    for (index,) in db.execute(text(
+        "SELECT indexname FROM pg_indexes WHERE tablename = 'transactions_unpartitioned'"
+    )).all():
+        db.execute(text(f'ALTER INDEX "{index}" RENAME TO "{index[:45]}_unpartitioned"'))
+    models.Transaction.__table__.create(bind=db.connection())
+    columns = ", ".join(COLUMNS)
+    for (month,) in db.execute(text(
+        "SELECT DISTINCT CAST(date_trunc('month', date) AS date) FROM transactions_unpartitioned ORDER BY 1"
+    )).all():
+        _create_partition(db, month)
+    db.execute(text(f"INSERT INTO transactions ({columns}) SELECT {columns} FROM transactions_unpartitioned"))
+    db.execute(text(
+        "SELECT setval('transactions_id_seq', GREATEST((SELECT max(id) FROM transactions), 1))"
+    ))
+    db.execute(text("DROP TABLE transactions_unpartitioned"))
+    db.commit()
+    user_cache.clear()
+    return True
+
+if __name__ == "__main__":
+    from database import SessionLocal
+    command = sys.argv[1] if len(sys.argv) > 1 else "ensure"
+    db = SessionLocal()
+    try:
+        if command == "ensure":
+            for name, moved in ensure_partitions(db):
+                print(f"Created {name} ({moved} rows moved from {DEFAULT_PARTITION}).")
+        elif command == "archive":
+            months = int(sys.argv[2]) if len(sys.argv) > 2 else ARCHIVE_AFTER_MONTHS
+            if months <= 0:
+                sys.exit("Usage: python partitions.py archive <months to keep online> (or set ARCHIVE_AFTER_MONTHS)")
+            for name, row_count, path in archive_partitions(db, add_months(month_start(date.today()), -months)):
+                print(f"Archived {name}: {row_count} rows to {path}.")
+        elif command == "restore":
+            row_count = restore_archive(db, int(sys.argv[2]))
+            print(f"Restored {row_count} rows." if row_count is not None else "Archive not found.")
+        elif command == "migrate":
+            print("Partitioned transactions." if migrate(db) else "transactions is already partitioned.")
+        elif command == "list":
+            for name, start, end in list_partitions(db):
+                print(f"{name}: {start} to {end}")
+            for archive in db.query(models.TransactionArchive).order_by(models.TransactionArchive.range_start):
+                print(f"archive {archive.id}: {archive.partition_name}, {archive.row_count} rows, {archive.path}")
+        else:
+            sys.exit("Usage: python partitions.py [ensure|archive [months]|list|restore <archive_id>|migrate]")
+    finally:
+        db.close()
@@ -0,0 +1,91 @@
+# Password hashing on a bounded process pool
+#
+# argon2 is deliberately CPU- and memory-hard, so hashing in the request thread lets a login
+# storm starve every other endpoint. Hashes are computed in HASH_WORKERS worker processes;
+# at most HASH_WORKERS + HASH_QUEUE_SIZE hash jobs may be in flight, and callers beyond
+# that get 429 Too Many Requests instead of queueing without bound.
+
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+# argon2 cost parameters; changing them makes existing hashes get upgraded on the next login
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "4"))
+
+# 0 workers hashes inline in the calling thread (no process pool)
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_QUEUE_SIZE = int(os.getenv("HASH_QUEUE_SIZE", "32"))
+
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__rounds=ARGON2_TIME_COST,
+    argon2__memory_cost=ARGON2_MEMORY_COST,
+    argon2__parallelism=ARGON2_PARALLELISM,
+)
+
+_executor = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(HASH_WORKERS + HASH_QUEUE_SIZE)
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+def _verify_and_update(password: str, password_hash: str):
+    return pwd_context.verify_and_update(password, password_hash)
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                # spawn rather than fork: the API process is multi-threaded
+                _executor = ProcessPoolExecutor(max_workers=HASH_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+def _submit(fn, *args):
+    if not _slots.acquire(blocking=False):
+        raise HTTPException(status_code=429, detail="Too many concurrent password operations, please retry", headers={"Retry-After": "1"})
+    try:
+        future = _get_executor().submit(fn, *args)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future
+
+def _run(fn, *args):
+    if HASH_WORKERS == 0:
+        return fn(*args)
+    return _submit(fn, *args).result()
+
+async def _run_async(fn, *args):
+    if HASH_WORKERS == 0:
+        return fn(*args)
+    return await asyncio.wrap_future(_submit(fn, *args))
+
+def hash_password(password: str) -> str:
+    return _run(_hash, password)
+
+def verify_and_update(password: str, password_hash: str):
+    """Return (valid, new_hash); new_hash is set when the stored hash uses outdated parameters."""
+    return _run(_verify_and_update, password, password_hash)
+
+async def hash_password_async(password: str) -> str:
+    return await _run_async(_hash, password)
+
+async def verify_and_update_async(password: str, password_hash: str):
+    return await _run_async(_verify_and_update, password, password_hash)
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
@@ -0,0 +1,17 @@
+# Backfill monthly_rollups and wallet_daily_balances from the transactions table
+import sys
+from database import SessionLocal
+import crud
+
+def rebuild_rollups(user_id: int = None):
+    db = SessionLocal()
+    try:
+        rows = crud.rebuild_monthly_rollups(db, user_id=user_id)
+        print(f"Rebuilt {rows} monthly rollup rows.")
+        rows = crud.rebuild_wallet_daily_balances(db, user_id=user_id)
+        print(f"Rebuilt {rows} daily balance rows.")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    rebuild_rollups(int(sys.argv[1]) if len(sys.argv) > 1 else None)
@@ -0,0 +1,60 @@
+# RRULE-style recurrence for scheduled transactions
+#
+# Supports the RFC 5545 subset FREQ=DAILY|WEEKLY|MONTHLY|YEARLY with optional INTERVAL, COUNT and
+# UNTIL (YYYYMMDD), e.g. "FREQ=MONTHLY;INTERVAL=1". The n-th occurrence is computed from the start
+# date rather than from the previous occurrence, so a schedule starting on the 31st posts on the
+# last day of shorter months and returns to the 31st afterwards.
+
+import calendar
+from collections import namedtuple
+from datetime import date, timedelta
+
+FREQUENCIES = ("DAILY", "WEEKLY", "MONTHLY", "YEARLY")
+
+Rule = namedtuple("Rule", ["freq", "interval", "count", "until"])
+
+def parse_rrule(text: str) -> Rule:
+    parts = {}
+    for part in text.strip().upper().removeprefix("RRULE:").split(";"):
+        if not part:
+            continue
+        key, separator, value = part.partition("=")
+        if not separator:
+            raise ValueError(f"Invalid RRULE part '{part}'")
+        parts[key] = value
+
+    freq = parts.pop("FREQ", None)
+    if freq not in FREQUENCIES:
+        raise ValueError(f"FREQ must be one of {', '.join(FREQUENCIES)}")
+    interval = int(parts.pop("INTERVAL", "1"))
+    if interval < 1:
+        raise ValueError("INTERVAL must be positive")
+    count = int(parts.pop("COUNT")) if "COUNT" in parts else None
+    until = None
+    if "UNTIL" in parts:
+        value = parts.pop("UNTIL")[:8]
+        until = date(int(value[0:4]), int(value[4:6]), int(value[6:8]))
+    if parts:
+        raise ValueError(f"Unsupported RRULE parts: {', '.join(parts)}")
+    return Rule(freq, interval, count, until)
+
+def _add_months(start: date, months: int) -> date:
+    month_index = start.month - 1 + months
+    year, month = start.year + month_index // 12, month_index % 12 + 1
+    return date(year, month, min(start.day, calendar.monthrange(year, month)[1]))
+
+def occurrence(start: date, rule: Rule, index: int) -> date:
+    """Date of the index-th occurrence (0-based) of rule starting at start."""
+    step = index * rule.interval
+    if rule.freq == "DAILY":
+        return start + timedelta(days=step)
+    if rule.freq == "WEEKLY":
+        return start + timedelta(weeks=step)
+    if rule.freq == "MONTHLY":
+        return _add_months(start, step)
+    return _add_months(start, step * 12)
+
+def is_finished(rule: Rule, index: int, occurrence_date: date) -> bool:
+    if rule.count is not None and index >= rule.count:
+        return True
+    return rule.until is not None and occurrence_date > rule.until
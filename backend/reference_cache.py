@@ -0,0 +1,82 @@
+# In-process cache for reference data (currencies, countries, wallet types, categories)
+#
+# Reference tables change only through seed scripts, so they are loaded once per process and
+# served from memory. Entries expire after REFERENCE_CACHE_TTL seconds, or immediately on invalidate().
+
+import hashlib
+import json
+import os
+import threading
+import time
+from sqlalchemy.orm import joinedload
+from database import SessionLocal
+import models, schemas
+
+REFERENCE_CACHE_TTL = int(os.getenv("REFERENCE_CACHE_TTL", "3600"))
+
+class CacheEntry:
+    def __init__(self, items: list):
+        self.items = items
+        payload = json.dumps([item.model_dump(mode="json") for item in items], sort_keys=True)
+        self.etag = hashlib.sha1(payload.encode()).hexdigest()
+        self.loaded_at = time.monotonic()
+
+    def is_expired(self):
+        return time.monotonic() - self.loaded_at > REFERENCE_CACHE_TTL
+
+def _load_currencies(db):
+    query = db.query(models.Currency).order_by(models.Currency.id)
+    return [schemas.Currency.model_validate(row, from_attributes=True) for row in query]
+
+def _load_countries(db):
+    query = db.query(models.Country).options(joinedload(models.Country.currency)).order_by(models.Country.id)
+    return [schemas.Country.model_validate(row, from_attributes=True) for row in query]
+
+def _load_wallet_types(db):
+    query = db.query(models.WalletType).order_by(models.WalletType.id)
+    return [schemas.WalletType.model_validate(row, from_attributes=True) for row in query]
+
+def _load_transaction_categories(db):
+    query = db.query(models.TransactionCategory).order_by(models.TransactionCategory.id)
+    return [schemas.TransactionCategory.model_validate(row, from_attributes=True) for row in query]
+
+LOADERS = {
+    "currencies": _load_currencies,
+    "countries": _load_countries,
+    "wallet_types": _load_wallet_types,
+    "transaction_categories": _load_transaction_categories,
+}
+
+_entries = {}
+_lock = threading.Lock()
+
+def get(name: str) -> CacheEntry:
+    entry = _entries.get(name)
+    if entry is None or entry.is_expired():
+        with _lock:
+            entry = _entries.get(name)
+            if entry is None or entry.is_expired():
+                db = SessionLocal()
+                try:
+                    entry = CacheEntry(LOADERS[name](db))
+                finally:
+                    db.close()
+                _entries[name] = entry
+    return entry
+
+def load_all():
+    for name in LOADERS:
+        get(name)
+
+def invalidate(name: str = None):
+    with _lock:
+        if name is None:
+            _entries.clear()
+        else:
+            _entries.pop(name, None)
+
+def get_transaction_category_by_name(category_name: str):
+    for category in get("transaction_categories").items:
+        if category.name == category_name:
+            return category
+    return None
@@ -0,0 +1,64 @@
+# Background scheduler that posts due recurring transactions and maintains transaction partitions
+#
+# Run once (e.g. from cron) with `python scheduler.py`, keep polling with `python scheduler.py --loop`,
+# or set RECURRING_SCHEDULER=true to run the loop in a thread inside the API process. Several
+# schedulers may run at once: due schedules are claimed with FOR UPDATE SKIP LOCKED.
+
+import os
+import sys
+import threading
+from database import SessionLocal
+import crud, partitions
+
+RECURRING_SCHEDULER = os.getenv("RECURRING_SCHEDULER", "false").lower() in ("1", "true", "yes")
+SCHEDULER_INTERVAL = float(os.getenv("SCHEDULER_INTERVAL", "60"))  # Seconds between runs
+
+_stop = threading.Event()
+_thread = None
+
+def run_once():
+    db = SessionLocal()
+    try:
+        return crud.run_recurring_transactions(db)
+    finally:
+        db.close()
+
+def maintain_partitions():
+    db = SessionLocal()
+    try:
+        return partitions.maintain(db)
+    finally:
+        db.close()
+
+def run_forever(interval: float = SCHEDULER_INTERVAL):
+    while not _stop.is_set():
+        try:
+            run_once()
+        except Exception as e:
+            print(f"Recurring transaction run failed: {e}", file=sys.stderr)
+        try:
+            maintain_partitions()
+        except Exception as e:
+            print(f"Partition maintenance failed: {e}", file=sys.stderr)
+        _stop.wait(interval)
+
+def start():
+    global _thread
+    if _thread is None:
+        _stop.clear()
+        _thread = threading.Thread(target=run_forever, name="recurring-scheduler", daemon=True)
+        _thread.start()
+
+def stop():
+    global _thread
+    if _thread is not None:
+        _stop.set()
+        _thread.join()
+        _thread = None
+
+if __name__ == "__main__":
+    if "--loop" in sys.argv:
+        run_forever()
+    else:
+        result = run_once()
+        print(f"Posted {result['posted']} transactions from {result['schedules']} schedules ({result['failed']} failed).")
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import Optional
 from datetime import date
 
@@ -14,8 +14,7 @@ class CurrencyCreate(CurrencyBase):
 class Currency(CurrencyBase):
     id: int
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class CountryBase(BaseModel):
     name: str
@@ -29,8 +28,7 @@ class Country(CountryBase):
     id: int
     currency: Optional[Currency] = None
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class WalletTypeBase(BaseModel):
     name: str
@@ -45,8 +43,7 @@ class WalletTypeCreate(WalletTypeBase):
 class WalletType(WalletTypeBase):
     id: int
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class TransactionCategoryBase(BaseModel):
     name: str
@@ -59,8 +56,7 @@ class TransactionCategoryCreate(TransactionCategoryBase):
 class TransactionCategory(TransactionCategoryBase):
     id: int
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Main table schemas
 class UserBase(BaseModel):
@@ -86,14 +82,14 @@ class User(UserBase):
     country: Optional[Country] = None
     currency: Optional[Currency] = None
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class WalletBase(BaseModel):
     name: str
     type_id: int
     balance: float
     color: str
+    currency_id: Optional[int] = None  # Defaults to the owner's home currency
 
 class WalletCreate(WalletBase):
     pass
@@ -103,8 +99,7 @@ class Wallet(WalletBase):
     type: Optional[WalletType] = None
     owner_id: int
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class TransactionBase(BaseModel):
     category_id: Optional[int] = None
@@ -122,8 +117,7 @@ class Transaction(TransactionBase):
     wallet_id: Optional[int] = None  # Made optional to handle deleted wallets
     owner_id: int
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class SavingsGoalBase(BaseModel):
     name: str
@@ -141,8 +135,123 @@ class SavingsGoal(SavingsGoalBase):
     id: int
     owner_id: int
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+class SavingsGoalProgress(BaseModel):
+    id: int
+    name: str
+    savings_type: Optional[str] = None
+    linked_wallet_id: Optional[int] = None
+    goal_amount: float
+    current_amount: float  # Linked goals report their wallet's balance
+    remaining_amount: float
+    progress_percent: float
+    target_date: Optional[date] = None
+    monthly_rate: Optional[float] = None  # Observed savings per month
+    required_monthly_rate: Optional[float] = None  # Needed per month to reach the goal by target_date
+    projected_completion_date: Optional[date] = None
+
+# Analytics schemas
+class AnalyticsSummary(BaseModel):
+    income: float
+    expense: float
+    net: float
+    count: int
+    currency_id: Optional[int] = None  # The user's home currency, which every total is converted to
+
+class MonthlyTotal(BaseModel):
+    month: date
+    income: float
+    expense: float
+    count: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+class CategoryTotal(BaseModel):
+    category_id: Optional[int] = None
+    category_name: Optional[str] = None
+    type: str
+    total: float
+    count: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+class WalletTotal(BaseModel):
+    wallet_id: Optional[int] = None
+    income: float
+    expense: float
+    count: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+class TransactionSearchResult(Transaction):
+    rank: float
+    highlight: Optional[str] = None  # HTML-escaped description with matches wrapped in <mark>...</mark>
+
+# Dashboard schemas
+class Dashboard(BaseModel):
+    wallets: list[Wallet]
+    currency_id: Optional[int] = None  # Home currency of total_balance and the month totals
+    total_balance: float
+    recent_transactions: list[Transaction]
+    month_start: date
+    month_income: float  # Month to date
+    month_expense: float
+    savings_rate: Optional[float] = None  # Percent of month-to-date income not spent
+    largest_expenses: list[Transaction]  # Largest expenses this month
+    savings_goals: list[SavingsGoalProgress]
+
+# Balance history schemas
+class BalancePoint(BaseModel):
+    date: date  # Start of the day, week or month
+    balance: float  # Closing balance at the end of the period
+
+# Recurring transaction schemas
+class RecurringTransactionBase(BaseModel):
+    wallet_id: int
+    category_id: Optional[int] = None
+    amount: float
+    type: str  # 'income' or 'expense'
+    description: Optional[str] = None
+    rrule: str  # e.g. 'FREQ=MONTHLY;INTERVAL=1', optionally with COUNT or UNTIL
+    start_date: date
+
+class RecurringTransactionCreate(RecurringTransactionBase):
+    pass
+
+class RecurringTransaction(RecurringTransactionBase):
+    id: int
+    owner_id: int
+    next_run_at: Optional[date] = None
+    active: bool
+    last_error: Optional[str] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+class SchedulerRunResult(BaseModel):
+    schedules: int
+    posted: int
+    failed: int
+
+# Batch schemas
+class TransactionBatchResult(BaseModel):
+    ids: list[int]
+
+class TransactionBatchDelete(BaseModel):
+    ids: list[int]
+
+class TransactionBatchDeleteResult(BaseModel):
+    deleted: list[int]
+
+# Import schemas
+class ImportRowError(BaseModel):
+    row: int
+    error: str
+
+class ImportResult(BaseModel):
+    imported: int
+    failed: int
+    errors: list[ImportRowError]
 
 class TransferRequest(BaseModel):
     from_wallet_id: int
@@ -0,0 +1,92 @@
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from fastapi.testclient import TestClient
+from main import app
+from database import SessionLocal
+import models
+
+# Concurrency stress tests: run in-process against the DATABASE_URL database, e.g.
+#   python test_concurrency.py   (or: pytest test_concurrency.py)
+# Hundreds of parallel writers hit the same wallets; balances must match the committed transactions exactly.
+# Size the pool for the writer count, e.g. DB_POOL_SIZE=20 DB_MAX_OVERFLOW=20. These check correctness only;
+# throughput is measured with benchmark.load.
+
+client = TestClient(app)
+
+WRITERS = 200
+THREADS = 32
+
+def create_user_with_wallets(balances):
+    user_data = {
+        "name": "Concurrency User",
+        "email": f"concurrency-{uuid.uuid4().hex[:8]}@example.com",
+        "password": "securepassword"
+    }
+    user = client.post("/api/users/", json=user_data).json()
+    wallets = []
+    for i, balance in enumerate(balances):
+        wallet_data = {"name": f"Wallet {i}", "type_id": 1, "balance": balance, "color": "#000000"}
+        wallets.append(client.post(f"/api/users/{user['id']}/wallets/", json=wallet_data).json())
+    return user, wallets
+
+def wallet_balance(wallet_id: int) -> float:
+    db = SessionLocal()
+    try:
+        return float(db.get(models.Wallet, wallet_id).balance)
+    finally:
+        db.close()
+
+def run_parallel(fn, count: int):
+    with ThreadPoolExecutor(THREADS) as executor:
+        return list(executor.map(fn, range(count)))
+
+def assert_rejections(responses, detail: str):
+    # A deadlock or lock timeout surfacing as a 400 must not pass for an ordinary rejection
+    codes = [response.status_code for response in responses]
+    assert set(codes) <= {200, 400}, f"unexpected status codes {set(codes)}"
+    details = {response.json()["detail"] for response in responses if response.status_code == 400}
+    assert all(d.startswith(detail) for d in details), f"unexpected rejections {details}"
+    return codes
+
+def test_parallel_expenses_never_overdraw():
+    user, (wallet,) = create_user_with_wallets([1000.0])
+
+    def spend(_):
+        transaction_data = {"wallet_id": wallet["id"], "amount": 10.0, "date": "2024-01-15", "type": "expense"}
+        return client.post(f"/api/users/{user['id']}/transactions/", json=transaction_data)
+
+    codes = assert_rejections(run_parallel(spend, WRITERS), "Insufficient balance. Current balance:")
+    # Exactly 100 expenses of 10 fit into 1000
+    assert codes.count(200) == 100, f"{codes.count(200)} expenses succeeded"
+    assert wallet_balance(wallet["id"]) == 0.0
+    print(f"expenses: {codes.count(200)} ok, {codes.count(400)} rejected")
+
+def test_parallel_transfers_conserve_money():
+    user, wallets = create_user_with_wallets([500.0, 500.0, 500.0])
+
+    def transfer(i):
+        source, destination = wallets[i % 3], wallets[(i + 1 + i // 3 % 2) % 3]
+        transfer_data = {"from_wallet_id": source["id"], "to_wallet_id": destination["id"], "amount": 7.0}
+        return client.post(f"/api/users/{user['id']}/transfer/", json=transfer_data)
+
+    codes = assert_rejections(run_parallel(transfer, WRITERS), "Insufficient balance in source wallet")
+    balances = [wallet_balance(wallet["id"]) for wallet in wallets]
+    assert sum(balances) == 1500.0, f"money not conserved: {balances}"
+    assert min(balances) >= 0, f"negative balance: {balances}"
+    print(f"transfers: {codes.count(200)} ok, {codes.count(400)} rejected")
+
+def test_parallel_deletes_restore_once():
+    user, (wallet,) = create_user_with_wallets([100.0])
+    transaction_data = {"wallet_id": wallet["id"], "amount": 40.0, "date": "2024-01-15", "type": "expense"}
+    transaction = client.post(f"/api/users/{user['id']}/transactions/", json=transaction_data).json()
+
+    codes = run_parallel(lambda _: client.delete(f"/api/transactions/{transaction['id']}").status_code, 20)
+    assert codes.count(200) == 1, f"{codes.count(200)} deletes succeeded"
+    assert wallet_balance(wallet["id"]) == 100.0
+
+if __name__ == "__main__":
+    print("Running concurrency stress tests...")
+    test_parallel_expenses_never_overdraw()
+    test_parallel_transfers_conserve_money()
+    test_parallel_deletes_restore_once()
+    print("Concurrency stress tests passed.")
@@ -0,0 +1,105 @@
+from contextlib import contextmanager
+from sqlalchemy import event
+from fastapi.testclient import TestClient
+from main import app
+from database import engine
+import user_cache
+
+# Query budget tests: run in-process against the DATABASE_URL database, e.g.
+#   python test_query_budget.py   (or: pytest test_query_budget.py)
+# Each list endpoint must stay within a fixed number of SQL statements however many rows it returns.
+
+client = TestClient(app)
+
+QUERY_BUDGET = {
+    "/api/users/": 1,
+    "/api/users/{user_id}": 1,
+    "/api/users/{user_id}/wallets/": 1,
+    "/api/users/{user_id}/transactions/": 1,
+    "/api/users/{user_id}/savings_goals/": 1,
+    "/api/users/{user_id}/dashboard": 5,
+    "/api/countries/": 1,
+}
+
+ROWS_PER_LIST = 20
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+def create_test_data():
+    import uuid
+    user_data = {
+        "name": "Query Budget User",
+        "email": f"query-budget-{uuid.uuid4().hex[:8]}@example.com",
+        "password": "securepassword",
+        "country_id": 1,
+        "currency_id": 1
+    }
+    user = client.post("/api/users/", json=user_data).json()
+    wallets = []
+    for i in range(ROWS_PER_LIST):
+        wallet_data = {"name": f"Wallet {i}", "type_id": 1 + i % 3, "balance": 1000.0, "color": "#000000"}
+        wallets.append(client.post(f"/api/users/{user['id']}/wallets/", json=wallet_data).json())
+    for i in range(ROWS_PER_LIST):
+        transaction_data = {
+            "wallet_id": wallets[i]["id"],
+            "category_id": 1 + i % 5,
+            "amount": 10.0,
+            "date": "2024-01-15",
+            "type": "income"
+        }
+        client.post(f"/api/users/{user['id']}/transactions/", json=transaction_data)
+    for i in range(ROWS_PER_LIST):
+        goal_data = {"name": f"Goal {i}", "goal_amount": 100.0, "current_amount": 0.0}
+        client.post(f"/api/users/{user['id']}/savings_goals/", json=goal_data)
+    return user
+
+def test_list_endpoints_within_query_budget():
+    user = create_test_data()
+    for path, budget in QUERY_BUDGET.items():
+        url = path.format(user_id=user["id"])
+        with count_queries() as statements:
+            response = client.get(url)
+        assert response.status_code == 200, f"{url} returned {response.status_code}"
+        assert len(statements) <= budget, f"{url} ran {len(statements)} queries (budget {budget}):\n" + "\n".join(statements)
+        print(f"{url}: {len(statements)} queries")
+
+def test_cached_reads_skip_database_until_next_write():
+    user = create_test_data()
+    url = f"/api/users/{user['id']}/wallets/"
+    client.get(url)
+    with count_queries() as statements:
+        cached = client.get(url)
+    assert len(statements) == 0, f"Cached {url} ran {len(statements)} queries"
+
+    wallet = cached.json()[0]
+    transaction_data = {"wallet_id": wallet["id"], "amount": 1.0, "date": "2024-01-16", "type": "expense"}
+    client.post(f"/api/users/{user['id']}/transactions/", json=transaction_data)
+    assert client.get(url).json()[0]["balance"] == wallet["balance"] - 1.0, "Write did not invalidate the cached wallets"
+
+def test_server_timing_reports_request_queries():
+    user = create_test_data()
+    url = f"/api/users/{user['id']}/dashboard"
+    user_cache.clear()
+    with count_queries() as statements:
+        response = client.get(url)
+    assert f'desc="{len(statements)} queries"' in response.headers["Server-Timing"], response.headers["Server-Timing"]
+    metrics = client.get("/metrics").text
+    assert 'http_request_queries_count{method="GET",route="/api/users/{user_id}/dashboard"}' in metrics
+
+if __name__ == "__main__":
+    print("Checking list endpoint query budgets...")
+    test_list_endpoints_within_query_budget()
+    test_cached_reads_skip_database_until_next_write()
+    test_server_timing_reports_request_queries()
+    print("Query budget checks passed.")
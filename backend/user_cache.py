@@ -0,0 +1,236 @@
+# Per-user response cache with write-through invalidation
+#
+# Every user has a version that crud bumps after each committed write for that user. Cache keys
+# embed the version current when the read started, so a write makes all of the user's earlier
+# entries unreachable at once; they are never served again and simply age out.
+#
+# The default backend is an in-process LRU. Setting USER_CACHE_URL (redis://...) switches to a shared
+# Redis backend, so every worker sees the same versions and invalidation is exact across processes.
+# Any client with redis-py's get/set methods can be passed to use_backend(), e.g. a stand-in in tests.
+#
+# The backend also remembers when each user last wrote; database.read_session() keeps a user's reads on
+# the primary for a few seconds afterwards, so replica lag never hides their own changes.
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+import fast_json, instrumentation
+
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "30"))  # Seconds; 0 disables the cache
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))  # Entries kept by the in-process backend
+USER_CACHE_URL = os.getenv("USER_CACHE_URL")  # e.g. redis://localhost:6379/0 for a shared cache
+
+class MemoryBackend:
+    """LRU of bytes values with per-entry expiry; versions are never evicted."""
+
+    def __init__(self, max_entries: int = USER_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, value), least recently used first
+        self._versions = {}
+        self._written = {}  # user_id -> time.time() of the last write
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: bytes, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_version(self, user_id: int):
+        return self._versions.get(user_id, 0)
+
+    def bump_version(self, user_id: int):
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            self._written[user_id] = time.time()
+
+    def written_at(self, user_id: int):
+        return self._written.get(user_id, 0.0)
+
+    def clear(self):
+        # Write times are kept, so a bulk change never cuts a user's sticky window short
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+    def size(self):
+        return len(self._entries)
+
+class RedisBackend:
+    """Shared backend on a redis-py compatible client (get, set with ex/nx)."""
+
+    def __init__(self, client, prefix: str = "mintro:cache:"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str):
+        import redis  # Optional dependency, only needed for the shared backend
+        return cls(redis.Redis.from_url(url))
+
+    def get(self, key: str):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes, ttl: float):
+        self.client.set(self.prefix + key, value, ex=max(int(ttl), 1))
+
+    def get_version(self, user_id: int):
+        # Versions are write timestamps rather than counters, so a version key lost to eviction or a
+        # restart is re-created with a fresh value and can never bring back entries cached under an old one
+        key = f"{self.prefix}version:{user_id}"
+        version = self.client.get(key)
+        if version is None:
+            self.client.set(key, time.time_ns(), nx=True)
+            version = self.client.get(key)
+        return int(version)
+
+    def bump_version(self, user_id: int):
+        self.client.set(f"{self.prefix}version:{user_id}", time.time_ns())
+
+    def written_at(self, user_id: int):
+        # The version is the last write's timestamp; a key re-created by get_version reads as a write just
+        # now, which only keeps that user on the primary a little longer
+        version = self.client.get(f"{self.prefix}version:{user_id}")
+        return int(version) / 1e9 if version is not None else 0.0
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self.prefix + "*"):
+            self.client.delete(key)
+
+    def size(self):
+        return None
+
+class CacheStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    def record(self, field: str, count: int = 1):
+        with self.lock:
+            setattr(self, field, getattr(self, field) + count)
+
+_backend = RedisBackend.from_url(USER_CACHE_URL) if USER_CACHE_URL else MemoryBackend()
+stats = CacheStats()
+
+def use_backend(backend):
+    """Swap the cache backend, e.g. RedisBackend(client) or a fresh MemoryBackend() in tests."""
+    global _backend
+    _backend = backend
+
+def get_backend():
+    return _backend
+
+def invalidate(*user_ids: int):
+    for user_id in user_ids:
+        try:
+            _backend.bump_version(user_id)
+            stats.record("invalidations")
+        except Exception:
+            # A shared backend that cannot be reached must not fail the write; its entries expire by TTL
+            stats.record("errors")
+
+def last_write(user_id: int):
+    """time.time() of the user's last committed write, 0 if none is known."""
+    try:
+        return _backend.written_at(user_id)
+    except Exception:
+        # Without the shared backend a recent write cannot be ruled out; report one so reads use the primary
+        stats.record("errors")
+        return time.time()
+
+def _lookup(user_id: int, key: str):
+    # Read the version before loading so a write that commits mid-load invalidates the result.
+    # Backend failures degrade to a miss that is not stored, so the cache never takes a read down with it.
+    try:
+        cache_key = f"{user_id}:{_backend.get_version(user_id)}:{key}"
+        value = _backend.get(cache_key)
+    except Exception:
+        stats.record("errors")
+        return None, None
+    stats.record("hits" if value is not None else "misses")
+    return cache_key, value
+
+def _store(cache_key: str, value: bytes):
+    try:
+        _backend.set(cache_key, value, USER_CACHE_TTL)
+    except Exception:
+        stats.record("errors")
+
+def get_or_load(user_id: int, key: str, loader):
+    """Return the cached bytes for (user_id, key), calling loader() to produce them on a miss."""
+    if USER_CACHE_TTL <= 0:
+        return loader()
+    cache_key, value = _lookup(user_id, key)
+    if value is None:
+        value = loader()
+        if cache_key is not None:
+            _store(cache_key, value)
+    return value
+
+async def get_or_load_async(user_id: int, key: str, loader):
+    """get_or_load for a coroutine loader."""
+    if USER_CACHE_TTL <= 0:
+        return await loader()
+    cache_key, value = _lookup(user_id, key)
+    if value is None:
+        value = await loader()
+        if cache_key is not None:
+            _store(cache_key, value)
+    return value
+
+# Responses are cached already serialized, with their headers, so a hit skips the database and pydantic
+_adapters = {}
+
+def request_key(request: Request):
+    return request.url.path + "?" + "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+
+def serialize(response_model, data, headers: dict = None):
+    # response_model=None means data is already JSON-ready rows from crud, encoded with fast_json
+    with instrumentation.timed_serialization():
+        if response_model is None:
+            body = fast_json.dumps(data)
+        else:
+            adapter = _adapters.get(response_model)
+            if adapter is None:
+                adapter = _adapters[response_model] = TypeAdapter(response_model)
+            body = adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+    return json.dumps(headers or {}).encode() + b"\n" + body
+
+def to_response(value: bytes):
+    headers, _, body = value.partition(b"\n")
+    return Response(content=body, media_type="application/json", headers=json.loads(headers))
+
+def clear():
+    _backend.clear()
+
+def get_cache_metrics():
+    lookups = stats.hits + stats.misses
+    return {
+        "backend": type(_backend).__name__,
+        "ttl_seconds": USER_CACHE_TTL,
+        "entries": _backend.size(),
+        "hits": stats.hits,
+        "misses": stats.misses,
+        "hit_ratio": round(stats.hits / lookups, 4) if lookups else None,
+        "invalidations": stats.invalidations,
+        "errors": stats.errors,
+    }